@@ -0,0 +1,60 @@
+import io
+import functools
+
+from PIL import Image, ImageDraw, ImageFont
+
+from tools import error_handler_common
+
+
+'''
+Functions for image assets shared by draw functions. Background images are decoded once
+per process (bot process and every render worker) and draw functions get their copies,
+so files from src/image/backgrounds are not opened and decoded by every render. Font
+files are read once and every render gets its own font object made from file bytes.
+
+Text cards (fees and explorers) have static labels which don't depend on data. They are
+drawn on background once to card layer, so card renders only draw values on its copy.
+'''
+
+
+@functools.lru_cache(maxsize=None)
+def load_background(path):
+    # Decodes background image once. Image is converted to RGB, as final images are saved
+    # to JPEG. ICC profile of file is kept in image info.
+    background = Image.open(path)
+    background.load()
+    return background.convert('RGB')
+
+@error_handler_common
+def get_background(path):
+    # Returns copy of decoded background image for drawing.
+    return load_background(path).copy()
+
+@functools.lru_cache(maxsize=None)
+def load_font_file(path):
+    # Reads font file once.
+    with open(path, 'rb') as font_file:
+        return font_file.read()
+
+@error_handler_common
+def get_font(path, size):
+    # Returns new font of size made from font file bytes. FreeType face of font object
+    # is not safe to use from several threads, so font objects are not shared by renders.
+    return ImageFont.truetype(io.BytesIO(load_font_file(path)), size)
+
+@functools.lru_cache(maxsize=None)
+def load_card_layer(path, font, items):
+    # Draws static text items (text, position, font size, color) on background once.
+    layer = load_background(path).copy()
+    draw = ImageDraw.Draw(layer)
+    for text, position, size, text_color in items:
+        draw.text(position, text, font=get_font(font, size), fill=text_color)
+    return layer
+
+@error_handler_common
+def get_card_layer(path, font, static_list):
+    # Returns copy of background with static labels of card. Static list has same groups
+    # of text parameters as lists of card values.
+    items = tuple((params.get('text'), tuple(params.get('position')), params.get('font_size'), params.get('text_color'))
+                  for static in static_list for params in static)
+    return load_card_layer(path, font, items).copy()
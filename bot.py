@@ -3,7 +3,6 @@ import asyncio
 import schedule
 import functools
 import threading
-import concurrent.futures
 import datetime as dt
 from telegram import ParseMode, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import Updater, PicklePersistence, ConversationHandler, CommandHandler, MessageHandler, Filters
@@ -16,7 +15,8 @@ from cmds.network import draw_network, write_network
 from cmds.lightning import draw_lightning, write_lightning
 from cmds.seized import draw_seized, write_seized
 from cmds.news import write_news
-from tools import error_handler_common, error_handler_async, update_databases, convert_date_to_days
+from tools import error_handler_common, error_handler_async, update_databases, convert_date_to_days, get_database_note
+from cache import record_render_request, start_render_cache
 from logger import main_logger
 from api.telegram import TOKEN
 
@@ -87,6 +87,7 @@ def market(update, context, days=False):
         days = convert_date_to_days(context.args[0])
         
     if days:    
+        record_render_request('market', days)
         if type(days) == int:
             if days < 1:
                 error_message = 'Future is unknown'
@@ -107,7 +108,7 @@ def market(update, context, days=False):
     with open(market_image, 'rb') as img_file:
         with open(market_text, 'r') as text_file:
             img_data = img_file.read()
-            text_caption = text_file.read()
+            text_caption = text_file.read() + get_database_note('market')
             context.bot.send_photo(chat_id=update.effective_chat.id,
                                    photo=img_data,
                                    caption=text_caption,
@@ -124,6 +125,7 @@ def network(update, context, days=False):
         days = convert_date_to_days(context.args[0])
 
     if days:
+        record_render_request('network', days)
         if type(days) == int:
             if days < 1:
                 error_message = 'Future is unknown'
@@ -150,7 +152,7 @@ def network(update, context, days=False):
     with open(network_image, 'rb') as img_file:
         with open(network_text, 'r') as text_file:
             img_data = img_file.read()
-            text_caption = text_file.read()
+            text_caption = text_file.read() + get_database_note('network')
             context.bot.send_photo(chat_id=update.effective_chat.id,
                                    photo=img_data,
                                    caption=text_caption,
@@ -167,6 +169,7 @@ def lightning(update, context, days=False):
         days = convert_date_to_days(context.args[0])
 
     if days:
+        record_render_request('lightning', days)
         if type(days) == int:
             if days < 1:
                 error_message = 'Future is unknown'
@@ -193,7 +196,7 @@ def lightning(update, context, days=False):
     with open(lightning_image, 'rb') as img_file:
         with open(lightning_text, 'r') as text_file:
             img_data = img_file.read()
-            text_caption = text_file.read()
+            text_caption = text_file.read() + get_database_note('lightning')
             context.bot.send_photo(chat_id=update.effective_chat.id,
                                    photo=img_data,
                                    caption=text_caption,
@@ -210,6 +213,7 @@ def etfs(update, context, days=False):
         days = convert_date_to_days(context.args[0])
 
     if days:
+        record_render_request('etfs', days)
         if type(days) == int:
             if days < 1:
                 error_message = 'Future is unknown'
@@ -236,7 +240,7 @@ def etfs(update, context, days=False):
     with open(etfs_image, 'rb') as img_file:
         with open(etfs_text, 'r') as text_file:
             img_data = img_file.read()
-            text_caption = text_file.read()
+            text_caption = text_file.read() + get_database_note('etfs')
             context.bot.send_photo(chat_id=update.effective_chat.id,
                                    photo=img_data,
                                    caption=text_caption,
@@ -253,6 +257,7 @@ def seized(update, context, days=False):
         days = convert_date_to_days(context.args[0])
 
     if days:
+        record_render_request('seized', days)
         if type(days) == int:
             if days < 1:
                 error_message = 'Future is unknown'
@@ -279,7 +284,7 @@ def seized(update, context, days=False):
     with open(seized_image, 'rb') as img_file:
         with open(seized_text, 'r') as text_file:
             img_data = img_file.read()
-            text_caption = text_file.read()
+            text_caption = text_file.read() + get_database_note('seized')
             context.bot.send_photo(chat_id=update.effective_chat.id,
                                    photo=img_data,
                                    caption=text_caption,
@@ -400,6 +405,7 @@ def fees(update, context):
         img_data = img_file.read()
         context.bot.send_photo(chat_id=update.effective_chat.id,
                                 photo=img_data,
+                                caption=get_database_note('fees'),
                                 parse_mode=ParseMode.MARKDOWN,
                                 reply_markup=ReplyKeyboardRemove())
     main_logger.info('/fees processed')
@@ -412,6 +418,7 @@ def exchanges(update, context):
         img_data = img_file.read()
         context.bot.send_photo(chat_id=update.effective_chat.id,
                                 photo=img_data,
+                                caption=get_database_note('exchanges'),
                                 parse_mode=ParseMode.MARKDOWN,
                                 reply_markup=ReplyKeyboardRemove())
     main_logger.info('/exchanges processed')
@@ -424,6 +431,7 @@ def pools(update, context):
         img_data = img_file.read()
         context.bot.send_photo(chat_id=update.effective_chat.id,
                                 photo=img_data,
+                                caption=get_database_note('pools'),
                                 parse_mode=ParseMode.MARKDOWN,
                                 reply_markup=ReplyKeyboardRemove())
     main_logger.info('/pools processed')
@@ -989,12 +997,10 @@ async def run_schedule():
 
 @error_handler_async
 async def run_bot():
+    start_render_cache()
     start_bot()
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        run_database_update = executor.submit(update_databases)
-        concurrent.futures.wait([run_database_update])
-
-    asyncio.create_task(run_schedule())
+    update_databases() # Returns right away, databases are warmed up in background
+    await run_schedule()
 
 
 
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import functools
+import importlib
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+import config
+from logger import main_logger
+from tools import (error_handler_common,
+                   get_database_version,
+                   subscribe_database_versions,
+                   write_database_file)
+from store import load_chart, get_series_span
+
+
+'''
+Functions for render cache of images and markdown made by draw_* and write_* functions.
+
+Rendered file is cached by function, normalized period of days, versions of databases
+used by command and version of code drawing it (images configuration and module sources),
+so files rendered before deploy are not served. Cache has two layers bounded by bytes
+with least recently used entries evicted first: memory and disk. Entries are evicted when
+ingest publishes new version of any database they were rendered from. After that popular
+periods of commands are rendered again in background.
+'''
+
+
+# Memory layer (key -> entry with rendered bytes), disk layer index and lock for both:
+cache_memory = OrderedDict()
+cache_disk = {}
+cache_lock = threading.Lock()
+
+# Counts of periods requested by users per command (saved by precompute thread if changed)
+# and commands waiting for precompute:
+render_requests = {}
+render_requests_changed = False
+precompute_pending = set()
+precompute_executor = None # Started by start_render_cache
+
+
+@error_handler_common
+def get_render_files(command):
+    # Returns chart and snapshot files of databases used by command.
+    render_files = []
+    for database in config.renders.get(command, [command]):
+        for databases in [config.charts, config.snapshots]:
+            if database in databases:
+                render_files.append(databases[database]['file']['path'] + databases[database]['file']['name'])
+    return render_files
+
+@functools.lru_cache(maxsize=None)
+@error_handler_common
+def get_render_code_version(command):
+    # Returns hash of images configuration and source of modules drawing command, so files
+    # rendered by previous deploy are not served from disk layer.
+    code_version = hashlib.sha256(json.dumps(config.images.get(command), sort_keys=True, default=str).encode())
+    code_path = os.path.dirname(os.path.abspath(__file__)) + '/'
+    for module_file in [f'cmds/{command}.py', 'assets.py', 'stats.py', 'store.py']:
+        if os.path.isfile(code_path + module_file):
+            with open(code_path + module_file, 'rb') as source_file:
+                code_version.update(source_file.read())
+    return code_version.hexdigest()[:16]
+
+@error_handler_common
+def normalize_render_days(days):
+    # Normalizes period of days, so same plot requested differently has same key.
+    if isinstance(days, int) and not isinstance(days, bool):
+        return max(days, 1)
+    return 'max'
+
+@error_handler_common
+def make_render_key(function_name, command, days):
+    # Returns cache key and files used by command for render of function. Key includes
+    # versions of databases and of code drawing command.
+    render_files = get_render_files(command)
+    render_versions = [get_database_version(file) for file in render_files]
+    render_key = json.dumps([function_name, normalize_render_days(days), render_versions, get_render_code_version(command)])
+    return hashlib.sha256(render_key.encode()).hexdigest()[:32], render_files
+
+@error_handler_common
+def load_cache_index():
+    # Loads disk layer index left by previous run. Entries without files are skipped.
+    index_file = config.cache['path'] + 'index.json'
+    if not os.path.isfile(index_file):
+        return
+    with open(index_file, 'r') as json_file:
+        index = json.load(json_file)
+    with cache_lock:
+        for key, entry in index.items():
+            if os.path.isfile(config.cache['path'] + key):
+                cache_disk[key] = entry
+
+@error_handler_common
+def save_cache_index():
+    # Saves disk layer index. Must be called with cache_lock.
+    os.makedirs(config.cache['path'], exist_ok=True)
+    write_database_file(config.cache['path'] + 'index.json', json.dumps(cache_disk, separators=(',', ':')))
+
+@error_handler_common
+def evict_cache_entries():
+    # Evicts least recently used entries until both layers fit their byte limits.
+    # Must be called with cache_lock.
+    while cache_memory and sum(entry['size'] for entry in cache_memory.values()) > config.cache['memory']:
+        cache_memory.popitem(last=False)
+    disk_entries = sorted(cache_disk.items(), key=lambda item: item[1]['used'])
+    disk_size = sum(entry['size'] for entry in cache_disk.values())
+    while disk_entries and disk_size > config.cache['disk']:
+        key, entry = disk_entries.pop(0)
+        disk_size -= entry['size']
+        del cache_disk[key]
+        if os.path.exists(config.cache['path'] + key):
+            os.remove(config.cache['path'] + key)
+
+@error_handler_common
+def get_cache_entry(key):
+    # Returns rendered file path and bytes from memory or disk layer, None if not cached.
+    with cache_lock:
+        if key in cache_memory:
+            cache_memory.move_to_end(key)
+            return cache_memory[key]['file'], cache_memory[key]['data']
+        entry = cache_disk.get(key)
+        if not entry:
+            return None
+        entry['used'] = time.time()
+    with open(config.cache['path'] + key, 'rb') as cache_file:
+        data = cache_file.read()
+    with cache_lock:
+        cache_memory[key] = dict(entry, data=data)
+        evict_cache_entries()
+    return entry['file'], data
+
+@error_handler_common
+def put_cache_entry(key, file, sources):
+    # Caches rendered file in both layers.
+    with open(file, 'rb') as rendered_file:
+        data = rendered_file.read()
+    os.makedirs(config.cache['path'], exist_ok=True)
+    write_database_file(config.cache['path'] + key, data)
+    entry = {'file': file, 'sources': sources, 'size': len(data), 'used': time.time()}
+    with cache_lock:
+        cache_memory[key] = dict(entry, data=data)
+        cache_disk[key] = entry
+        evict_cache_entries()
+        save_cache_index()
+
+@error_handler_common
+def invalidate_cache_entries(database, file, version):
+    # Evicts entries rendered from previous version of database file.
+    with cache_lock:
+        for key in [key for key, entry in cache_disk.items() if file in entry['sources']]:
+            del cache_disk[key]
+            cache_memory.pop(key, None)
+            if os.path.exists(config.cache['path'] + key):
+                os.remove(config.cache['path'] + key)
+        for key in [key for key, entry in cache_memory.items() if file in entry['sources']]:
+            del cache_memory[key]
+        save_cache_index()
+
+@error_handler_common
+def load_render_requests():
+    # Loads counts of periods requested by users in previous runs.
+    requests_file = config.precompute['requests']
+    if not os.path.isfile(requests_file):
+        return
+    with open(requests_file, 'r') as json_file:
+        requests = json.load(json_file)
+    with cache_lock:
+        for command, periods in requests.items():
+            render_requests[command] = {int(days) if days.isdigit() else days: count for days, count in periods.items()}
+
+@error_handler_common
+def get_render_span(command):
+    # Returns days of data kept for command or None if it's unknown.
+    if command in config.pyramids:
+        first_date, last_date = get_series_span(command)
+        return max(int(last_date - first_date) // 86400, 1)
+    if command in config.charts:
+        return max(len(load_chart(command)) - 1, 1)
+    return None
+
+@error_handler_common
+def record_render_request(command, days):
+    # Counts period of days requested by user for command. Wrong input is not counted,
+    # periods longer than data of command are counted as longest period of data. Counts
+    # are kept in memory and saved by precompute thread.
+    global render_requests_changed
+    if days != 'max' and not (isinstance(days, int) and days > 0):
+        return
+    days = normalize_render_days(days)
+    render_span = get_render_span(command)
+    if days != 'max' and render_span:
+        days = min(days, render_span)
+    with cache_lock:
+        periods = render_requests.setdefault(command, {})
+        periods[days] = periods.get(days, 0) + 1
+        render_requests_changed = True
+
+@error_handler_common
+def save_render_requests():
+    # Saves counts of requested periods if they changed since last save.
+    global render_requests_changed
+    with cache_lock:
+        if not render_requests_changed:
+            return
+        requests = json.dumps({command: {str(days): count for days, count in periods.items()} for command, periods in render_requests.items()})
+        render_requests_changed = False
+    os.makedirs(os.path.dirname(config.precompute['requests']), exist_ok=True)
+    write_database_file(config.precompute['requests'], requests)
+
+@error_handler_common
+def get_precompute_periods(command):
+    # Returns configured periods of command and its most requested periods.
+    periods = [normalize_render_days(days) for days in config.precompute['periods']]
+    with cache_lock:
+        requested = sorted(render_requests.get(command, {}).items(), key=lambda item: item[1], reverse=True)
+    for days, count in requested[:config.precompute['learned']]:
+        if days not in periods:
+            periods.append(days)
+    return periods
+
+@error_handler_common
+def precompute_command(command):
+    # Renders images and markdown of command for precompute periods. Waits {delay} first,
+    # so updates of several databases used by command cause one render.
+    time.sleep(config.precompute['delay'])
+    with cache_lock:
+        precompute_pending.discard(command)
+    save_render_requests()
+    module = importlib.import_module(f'cmds.{command}')
+    render_functions = [getattr(module, f'draw_{command}', None), getattr(module, f'write_{command}', None)]
+    precompute_start = time.perf_counter()
+    periods = get_precompute_periods(command)
+    for days in periods:
+        for render_function in render_functions:
+            if callable(render_function):
+                render_function(days)
+    main_logger.info(f'{command} periods {periods} precomputed in {round(time.perf_counter() - precompute_start, 1)} seconds')
+
+@error_handler_common
+def precompute_renders(database, file, version):
+    # Queues precompute of commands using updated database.
+    for command, databases in config.renders.items():
+        if database not in databases:
+            continue
+        with cache_lock:
+            if command in precompute_pending:
+                continue
+            precompute_pending.add(command)
+        precompute_executor.submit(precompute_command, command)
+
+@error_handler_common
+def start_render_cache():
+    # Loads disk layer index and requested periods and subscribes to database versions.
+    # Called by bot process only, render workers import command modules without cache.
+    global precompute_executor
+    precompute_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='precompute')
+    load_cache_index()
+    load_render_requests()
+    subscribe_database_versions(invalidate_cache_entries)
+    subscribe_database_versions(precompute_renders)
+
+def cache_render(command):
+    # Decorator for draw_* and write_* functions of command. Returns path to cached file
+    # if render with same period and databases versions was done before. File is restored
+    # to its path if removed or overwritten by render of other version.
+    def decorator(render_function):
+        render_signature = inspect.signature(render_function)
+
+        @functools.wraps(render_function)
+        def wrapper(*args, **kwargs):
+            render_arguments = render_signature.bind(*args, **kwargs)
+            render_arguments.apply_defaults()
+            render_days = render_arguments.arguments.get('days')
+            render_key, render_sources = make_render_key(render_function.__name__, command, render_days)
+
+            cached = get_cache_entry(render_key)
+            if cached:
+                cached_file, cached_data = cached
+                write_database_file(cached_file, cached_data)
+                main_logger.debug(f'{cached_file} served from cache')
+                return cached_file
+
+            rendered_file = render_function(*args, **kwargs)
+            if rendered_file and os.path.isfile(rendered_file):
+                put_cache_entry(render_key, rendered_file, render_sources)
+            return rendered_file
+        return wrapper
+    return decorator
@@ -2,14 +2,15 @@ import os
 import sys
 import json
 import time
-import pandas as pd
 
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
 sys.path.append('.')
 import config
 from logger import main_logger
+from store import get_snapshot, load_chart
+from assets import get_card_layer, get_font
 from tools import (error_handler_common,
                    get_api_data,
                    format_quantity,
@@ -44,16 +45,14 @@ def explore_address(address):
     market_current = config.snapshots['market']
     market_current_file_path = market_current['file']['path']
     market_current_file_name = market_current['file']['name']
-    market_current_file_subdict = market_current['file']['subdict']
     market_current_file = market_current_file_path + market_current_file_name
 
     # Creation of key address variables:
     ADDRESS_DATE_CURRENT = datetime.utcnow().strftime("%Y-%m-%d %H:%M")
 
     if os.path.exists(market_current_file):
-        with open (market_current_file, 'r') as file:
-            market_current_data = json.load(file)[f'{market_current_file_subdict}']
-            market_current_price = market_current_data['current_price'][f'{config.currency_vs}']
+        market_current_data = get_snapshot('market')
+        market_current_price = market_current_data['current_price'][f'{config.currency_vs}']
         ADDRESS_FIAT_CURRENT_PRICE = format_currency(market_current_price, config.currency_vs_ticker, decimal=2)
         ADDRESS_FIAT_BALANCE = format_currency(market_current_price / 100_000_000 * address_response['final_balance'], config.currency_vs_ticker, decimal=2)
     else:
@@ -96,40 +95,46 @@ def explore_address(address):
     address_image_background_colors = address_image['backgrounds']['colors']
     address_image_file = address_image['path'] + f'address_{address}.jpg'
 
-    # Set text, position, size and color address parameters:
-    address_title_list = [
+    # Set text, position, size and color address parameters of static labels and values:
+    address_static_list = [
         [{'text': 'blockchain.com', 'position': address_image_background_colors['api'][1], 'font_size': 36, 'text_color': address_image_background_colors['api'][0]},
-        {'text': f'address information', 'position': address_image_background_colors['api'][2], 'font_size': 27, 'text_color': address_image_background_colors['api'][0]},
-        {'text': f'{config.currency_crypto_ticker} Price: {ADDRESS_FIAT_CURRENT_PRICE}', 'position': address_image_background_colors['metric'][1], 'font_size': 31, 'text_color': address_image_background_colors['metric'][0]},
+        {'text': f'address information', 'position': address_image_background_colors['api'][2], 'font_size': 27, 'text_color': address_image_background_colors['api'][0]}],
+
+        [{'text': f'Current {config.currency_crypto_ticker} Balance', 'position': (950, 370), 'font_size': 30, 'text_color': address_image_colors['titles']}],
+
+        [{'text': f'Current {config.currency_vs_ticker} Balance', 'position': (950, 555), 'font_size': 30, 'text_color': address_image_colors['titles']},
+        {'text': f'{config.currency_crypto_ticker} Recieved', 'position': (950, 705), 'font_size': 30, 'text_color': address_image_colors['titles']},
+        {'text': f'{config.currency_crypto_ticker} Sent', 'position': (950, 855), 'font_size': 30, 'text_color': address_image_colors['titles']}],
+
+        [{'text': 'UTXO', 'position': (1650, 555), 'font_size': 30, 'text_color': address_image_colors['titles']},
+        {'text': 'Transactions', 'position': (1650, 705), 'font_size': 30, 'text_color': address_image_colors['titles']},
+        {'text': 'Type', 'position': (1650, 855), 'font_size': 30, 'text_color': address_image_colors['titles']}]
+    ]
+
+    address_title_list = [
+        [{'text': f'{config.currency_crypto_ticker} Price: {ADDRESS_FIAT_CURRENT_PRICE}', 'position': address_image_background_colors['metric'][1], 'font_size': 31, 'text_color': address_image_background_colors['metric'][0]},
         {'text': f'UTC {ADDRESS_DATE_CURRENT}', 'position': address_image_background_colors['metric'][2], 'font_size': 31, 'text_color': address_image_background_colors['metric'][0]}],
-            
-        [{'text': f'{ADDRESS_CRYPTO_BALANCE}', 'position': (950, 245), 'font_size': 130, 'text_color': address_image_colors['titles_crypto']},
-        {'text': f'Current {config.currency_crypto_ticker} Balance', 'position': (950, 370), 'font_size': 30, 'text_color': address_image_colors['titles']}],
+
+        [{'text': f'{ADDRESS_CRYPTO_BALANCE}', 'position': (950, 245), 'font_size': 130, 'text_color': address_image_colors['titles_crypto']}],
 
         [{'text': f'{ADDRESS_FIAT_BALANCE}', 'position': (950, 500), 'font_size': 50, 'text_color': address_image_colors['titles_fiat']},
-        {'text': f'Current {config.currency_vs_ticker} Balance', 'position': (950, 555), 'font_size': 30, 'text_color': address_image_colors['titles']},
         {'text': f'{ADDRESS_CRYPTO_RECIEVED}', 'position': (950, 650), 'font_size': 50, 'text_color': address_image_colors['titles_crypto']},
-        {'text': f'{config.currency_crypto_ticker} Recieved', 'position': (950, 705), 'font_size': 30, 'text_color': address_image_colors['titles']},
-        {'text': f'{ADDRESS_CRYPTO_SENT}', 'position': (950, 800), 'font_size': 50, 'text_color': address_image_colors['titles_crypto']},
-        {'text': f'{config.currency_crypto_ticker} Sent', 'position': (950, 855), 'font_size': 30, 'text_color': address_image_colors['titles']}],
+        {'text': f'{ADDRESS_CRYPTO_SENT}', 'position': (950, 800), 'font_size': 50, 'text_color': address_image_colors['titles_crypto']}],
 
         [{'text': f'{ADDRESS_UTXO}', 'position': (1650, 500), 'font_size': 50, 'text_color': address_image_colors['titles_other']},
-        {'text': 'UTXO', 'position': (1650, 555), 'font_size': 30, 'text_color': address_image_colors['titles']},
         {'text': f'{ADDRESS_TRANSACTIONS_COUNT}', 'position': (1650, 650), 'font_size': 50, 'text_color': address_image_colors['titles_other']},
-        {'text': 'Transactions', 'position': (1650, 705), 'font_size': 30, 'text_color': address_image_colors['titles']},
-        {'text': f'{ADDRESS_TYPE}', 'position': (1650, 800), 'font_size': 50, 'text_color': address_image_colors['titles_other']},
-        {'text': 'Type', 'position': (1650, 855), 'font_size': 30, 'text_color': address_image_colors['titles']}]
+        {'text': f'{ADDRESS_TYPE}', 'position': (1650, 800), 'font_size': 50, 'text_color': address_image_colors['titles_other']}]
     ]
 
-    # Open background, draw text with set parameters and save final address image:
-    address_image = Image.open(address_image_background_path)
+    # Copy background with static labels, draw values and save final address image:
+    address_image = get_card_layer(address_image_background_path, address_image_font, address_static_list)
     address_draw = ImageDraw.Draw(address_image)
     for address_title in address_title_list:
         for address_params in address_title:
             address_text = address_params.get('text')
             address_position = address_params.get('position')
             address_size = address_params.get('font_size')
-            address_font = ImageFont.truetype(address_image_font, address_size)
+            address_font = get_font(address_image_font, address_size)
             address_text_color = address_params.get('text_color')
             address_draw.text(address_position, address_text, font=address_font, fill=address_text_color)
     address_image.save(address_image_file)
@@ -203,40 +208,46 @@ def explore_block(block):
     block_image_background_colors = block_image['backgrounds']['colors']
     block_image_file = block_image['path'] + f'block_{block}.jpg'
 
-    # Set text, position, size and color block parameters:
-    block_title_list = [
+    # Set text, position, size and color block parameters of static labels and values:
+    block_static_list = [
         [{'text': 'blockchain.com', 'position': block_image_background_colors['api'][1], 'font_size': 36, 'text_color': block_image_background_colors['api'][0]},
-        {'text': f'block status details', 'position': block_image_background_colors['api'][2], 'font_size': 26, 'text_color': block_image_background_colors['api'][0]},
-        {'text': f'Height {BLOCK}', 'position': block_image_background_colors['metric'][1], 'font_size': 31, 'text_color': block_image_background_colors['metric'][0]},
+        {'text': f'block status details', 'position': block_image_background_colors['api'][2], 'font_size': 26, 'text_color': block_image_background_colors['api'][0]}],
+
+        [{'text': f'{config.currency_crypto_ticker} Moved', 'position': (950, 370), 'font_size': 30, 'text_color': block_image_colors['titles']}],
+
+        [{'text': f'Fees, sats', 'position': (950, 555), 'font_size': 30, 'text_color': block_image_colors['titles']},
+        {'text': f'Weight, WU', 'position': (950, 705), 'font_size': 30, 'text_color': block_image_colors['titles']},
+        {'text': f'Size, bytes', 'position': (950, 855), 'font_size': 30, 'text_color': block_image_colors['titles']}],
+
+        [{'text': 'Depth', 'position': (1650, 555), 'font_size': 30, 'text_color': block_image_colors['titles']},
+        {'text': 'Transactions', 'position': (1650, 705), 'font_size': 30, 'text_color': block_image_colors['titles']},
+        {'text': 'Mined at, UTC', 'position': (1650, 855), 'font_size': 30, 'text_color': block_image_colors['titles']}]
+    ]
+
+    block_title_list = [
+        [{'text': f'Height {BLOCK}', 'position': block_image_background_colors['metric'][1], 'font_size': 31, 'text_color': block_image_background_colors['metric'][0]},
         {'text': f'Mined {BLOCK_DATE_AGE} days ago', 'position': block_image_background_colors['metric'][2], 'font_size': 31, 'text_color': block_image_background_colors['metric'][0]}],
-            
-        [{'text': f'{BLOCK_CRYPTO_AMOUNT}', 'position': (950, 245), 'font_size': 130, 'text_color': block_image_colors['titles_crypto']},
-        {'text': f'{config.currency_crypto_ticker} Moved', 'position': (950, 370), 'font_size': 30, 'text_color': block_image_colors['titles']}],
+
+        [{'text': f'{BLOCK_CRYPTO_AMOUNT}', 'position': (950, 245), 'font_size': 130, 'text_color': block_image_colors['titles_crypto']}],
 
         [{'text': f'{BLOCK_CRYPTO_FEE}', 'position': (950, 500), 'font_size': 50, 'text_color': block_image_colors['titles_crypto']},
-        {'text': f'Fees, sats', 'position': (950, 555), 'font_size': 30, 'text_color': block_image_colors['titles']},
         {'text': f'{BLOCK_WEIGHT}', 'position': (950, 650), 'font_size': 50, 'text_color': block_image_colors['titles_other']},
-        {'text': f'Weight, WU', 'position': (950, 705), 'font_size': 30, 'text_color': block_image_colors['titles']},
-        {'text': f'{BLOCK_SIZE}', 'position': (950, 800), 'font_size': 50, 'text_color': block_image_colors['titles_other']},
-        {'text': f'Size, bytes', 'position': (950, 855), 'font_size': 30, 'text_color': block_image_colors['titles']}],
+        {'text': f'{BLOCK_SIZE}', 'position': (950, 800), 'font_size': 50, 'text_color': block_image_colors['titles_other']}],
 
         [{'text': f'{BLOCK_DEPTH}', 'position': (1650, 500), 'font_size': 50, 'text_color': block_image_colors['titles_other']},
-        {'text': 'Depth', 'position': (1650, 555), 'font_size': 30, 'text_color': block_image_colors['titles']},
         {'text': f'{BLOCK_TRANSACTIONS_COUNT}', 'position': (1650, 650), 'font_size': 50, 'text_color': block_image_colors['titles_other']},
-        {'text': 'Transactions', 'position': (1650, 705), 'font_size': 30, 'text_color': block_image_colors['titles']},
-        {'text': f'{BLOCK_DATE_MINED}', 'position': (1650, 800), 'font_size': 50, 'text_color': block_image_colors['titles_other']},
-        {'text': 'Mined at, UTC', 'position': (1650, 855), 'font_size': 30, 'text_color': block_image_colors['titles']}]
+        {'text': f'{BLOCK_DATE_MINED}', 'position': (1650, 800), 'font_size': 50, 'text_color': block_image_colors['titles_other']}]
     ]
 
-    # Open background, draw text with set parameters and save final block image:
-    block_image = Image.open(block_image_background_path)
+    # Copy background with static labels, draw values and save final block image:
+    block_image = get_card_layer(block_image_background_path, block_image_font, block_static_list)
     block_draw = ImageDraw.Draw(block_image)
     for block_title in block_title_list:
         for block_params in block_title:
             block_text = block_params.get('text')
             block_position = block_params.get('position')
             block_size = block_params.get('font_size')
-            block_font = ImageFont.truetype(block_image_font, block_size)
+            block_font = get_font(block_image_font, block_size)
             block_text_color = block_params.get('text_color')
             block_draw.text(block_position, block_text, font=block_font, fill=block_text_color)
     block_image.save(block_image_file)
@@ -318,7 +329,7 @@ def explore_transaction(transaction_hash):
         else:
             pass
     if os.path.exists(market_days_max_file):
-        market_days_max_df = pd.read_csv(market_days_max_file)
+        market_days_max_df = load_chart('market_days_max')
         if TRANSACTION_DAY < market_days_max_df['date'][0]:
             TRANSACTION_FIAT_AMOUNT = 'COULDNT LOAD'
             TRANSACTION_FIAT_FEE = 'COULDNT LOAD'
@@ -349,40 +360,47 @@ def explore_transaction(transaction_hash):
     transaction_image_background_colors = transaction_image_background['colors']
     transaction_image_file = transaction_image['path'] + f'transaction_{transaction_hash}.jpg'
 
-    # Set text, position, size and color transaction parameters:
-    transaction_title_list = [
+    # Set text, position, size and color transaction parameters of static labels and values:
+    transaction_static_list = [
         [{'text': 'blockchain.com', 'position': transaction_image_background_colors['api'][1], 'font_size': 36, 'text_color': transaction_image_background_colors['api'][0]},
-        {'text': f'transaction overview', 'position': transaction_image_background_colors['api'][2], 'font_size': 26, 'text_color': transaction_image_background_colors['api'][0]},
-        {'text': f'{TRANSACTION_CONFIRMATIONS}', 'position': transaction_image_background_colors['metric'][1], 'font_size': 31, 'text_color': transaction_image_background_colors['metric'][0]},
+        {'text': f'transaction overview', 'position': transaction_image_background_colors['api'][2], 'font_size': 26, 'text_color': transaction_image_background_colors['api'][0]}],
+
+        [{'text': f'{config.currency_crypto_ticker} transfered', 'position': (100, 360), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+
+        [{'text': f'Fee, sats', 'position': (100, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': f'{config.currency_vs_ticker}, current price', 'position': (100, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': f'Fee, current price', 'position': (100, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+
+        [{'text': f'Height', 'position': (575, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': f'Weight, WU', 'position': (575, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': f'Size, bytes', 'position': (575, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+
+        [{'text': 'Version', 'position': (1050, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': 'Double Spend', 'position': (1050, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
+        {'text': 'Broadcasted at, UTC', 'position': (1050, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}]
+    ]
+
+    transaction_title_list = [
+        [{'text': f'{TRANSACTION_CONFIRMATIONS}', 'position': transaction_image_background_colors['metric'][1], 'font_size': 31, 'text_color': transaction_image_background_colors['metric'][0]},
         {'text': f'UTC {TRANSACTION_DATE_CURRENT}', 'position': transaction_image_background_colors['metric'][2], 'font_size': 31, 'text_color': transaction_image_background_colors['metric'][0]}],
-            
-        [{'text': f'{TRANSACTION_CRYPTO_AMOUNT}', 'position': (100, 245), 'font_size': 130, 'text_color': transaction_image_colors['titles_crypto']},
-        {'text': f'{config.currency_crypto_ticker} transfered', 'position': (100, 360), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+
+        [{'text': f'{TRANSACTION_CRYPTO_AMOUNT}', 'position': (100, 245), 'font_size': 130, 'text_color': transaction_image_colors['titles_crypto']}],
 
         [{'text': f'{TRANSACTION_CRYPTO_FEE}', 'position': (100, 500), 'font_size': 50, 'text_color': transaction_image_colors['titles_crypto']},
-        {'text': f'Fee, sats', 'position': (100, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
         {'text': f'{TRANSACTION_FIAT_AMOUNT}', 'position': (100, 650), 'font_size': 50, 'text_color': transaction_image_colors['titles_fiat']},
-        {'text': f'{config.currency_vs_ticker}, current price', 'position': (100, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
-        {'text': f'{TRANSACTION_FIAT_FEE}', 'position': (100, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_fiat']},
-        {'text': f'Fee, current price', 'position': (100, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+        {'text': f'{TRANSACTION_FIAT_FEE}', 'position': (100, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_fiat']}],
 
         [{'text': f'{TRANSACTION_HEIGHT}', 'position': (575, 500), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']},
-        {'text': f'Height', 'position': (575, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
         {'text': f'{TRANSACTION_WEIGHT}', 'position': (575, 650), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']},
-        {'text': f'Weight, WU', 'position': (575, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
-        {'text': f'{TRANSACTION_SIZE}', 'position': (575, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']},
-        {'text': f'Size, bytes', 'position': (575, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}],
+        {'text': f'{TRANSACTION_SIZE}', 'position': (575, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']}],
 
         [{'text': f'{TRANSACTION_VERSION}', 'position': (1050, 500), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']},
-        {'text': 'Version', 'position': (1050, 555), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
         {'text': f'{TRANSACTION_DOUBLE_SPEND}', 'position': (1050, 650), 'font_size': 50, 'text_color': transaction_image_double_spend['metric'][0]},
-        {'text': 'Double Spend', 'position': (1050, 705), 'font_size': 30, 'text_color': transaction_image_colors['titles']},
-        {'text': f'{TRANSACTION_DATE_TIME}', 'position': (1050, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']},
-        {'text': 'Broadcasted at, UTC', 'position': (1050, 855), 'font_size': 30, 'text_color': transaction_image_colors['titles']}]
+        {'text': f'{TRANSACTION_DATE_TIME}', 'position': (1050, 800), 'font_size': 50, 'text_color': transaction_image_colors['titles_other']}]
     ]
 
-    # Open background, draw text with set parameters and save final transaction image:
-    transaction_image = Image.open(transaction_image_background_path)
+    # Copy background with static labels, draw values and save final transaction image:
+    transaction_image = get_card_layer(transaction_image_background_path, transaction_image_font, transaction_static_list)
     transaction_draw = ImageDraw.Draw(transaction_image)
 
     for transaction_title in transaction_title_list:
@@ -390,7 +408,7 @@ def explore_transaction(transaction_hash):
             transaction_text = transaction_params.get('text')
             transaction_position = transaction_params.get('position')
             transaction_size = transaction_params.get('font_size')
-            transaction_font = ImageFont.truetype(transaction_image_font, transaction_size)
+            transaction_font = get_font(transaction_image_font, transaction_size)
             transaction_text_color = transaction_params.get('text_color')
             transaction_draw.text(transaction_position, transaction_text, font=transaction_font, fill=transaction_text_color)
     transaction_image.save(transaction_image_file)
@@ -1,28 +1,34 @@
-import io
 import os
 import sys
-import json
 import numpy as np
-import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 
 from matplotlib.lines import Line2D
+from matplotlib.artist import setp
 from matplotlib.ticker import FuncFormatter
 from matplotlib import font_manager
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
 sys.path.append('.')
 import config
 from logger import main_logger
+from store import get_snapshot, load_chart
 from tools import (error_handler_common,
+                   make_figure,
+                   get_plot_template,
+                   replace_template_fills,
+                   render_figure_image,
+                   save_plot_image,
                    define_key_metric_movement,
                    calculate_percentage_change,
                    format_amount,
                    format_currency,
                    format_percentage)
+from cache import cache_render
+from render import farm_render
+from assets import get_background, get_font
 
 
 
@@ -39,6 +45,50 @@ Markdown based on snapshot and chart values and formatted for user presentation.
 
 
 @error_handler_common
+def build_etfs_template():
+    # Builds ETFs figure template: axes, lines, formatters, ticks colors and axes order.
+    # Template is built once per thread, renders only update data, limits and legend.
+    plot = config.images['etfs']
+    plot_font = font_manager.FontProperties(fname=plot['font'])
+    plot_colors = plot['colors']
+    template = {'font': plot_font, 'colors': plot_colors, 'fills': []}
+
+    # Creation of plot figure:
+    fig = make_figure(figsize=(12, 7.4))
+    ax1 = fig.subplots()
+    fig.patch.set_alpha(0.0)
+    fig.patch.set_facecolor('none')
+    ax1.grid(True, axis = 'both', linestyle="dashed", linewidth=0.5, alpha=0.7)
+    ax2 = ax1.twinx()
+    ax3 = ax1.twinx()
+
+    line_holdings_btc, = ax1.plot([], [], color=plot_colors['btc'], label="btc", alpha=0.9, linewidth=14)
+    line_holdings_usd, = ax2.plot([], [], color=plot_colors['usd'], label="usd", linewidth=10)
+
+    # Set stacked area borders:
+    ax3.set_ylim(0, 100)
+
+    # Set axes text format:
+    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+
+    # Set axes ticks text color:
+    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
+    ax1.tick_params(axis="y", labelcolor=plot_colors['btc'])
+    ax2.tick_params(axis="y", labelcolor=plot_colors['usd'])
+
+    # Set axes order (higher value puts layer to the front):
+    ax1.set_zorder(3)
+    ax2.set_zorder(2)
+    ax3.set_zorder(1)
+
+    template.update({'figure': fig, 'axes': (ax1, ax2, ax3), 'lines': (line_holdings_btc, line_holdings_usd)})
+    return template
+
+
+@error_handler_common
+@cache_render('etfs')
+@farm_render('etfs')
 def draw_etfs(days=config.days['etfs']):
     # Draws ETFs plot with properties specified in user configuration.
     
@@ -50,12 +100,10 @@ def draw_etfs(days=config.days['etfs']):
 
     # Plot-related variables:
     plot = config.images['etfs']
-    plot_font = font_manager.FontProperties(fname=plot['font'])
-    plot_colors = plot['colors']
     plot_background = plot['backgrounds']
         
     # Create plot DataFrame:
-    plot_df = pd.read_csv(chart_file)
+    plot_df = load_chart('etfs')
     plot_df = plot_df.sort_values(by='time')
 
     holdings_btc_df = plot_df.groupby('time')['tvl'].sum().reset_index() # group items on time collumn and sum TVL for each date
@@ -114,59 +162,47 @@ def draw_etfs(days=config.days['etfs']):
     issuers_df_last_row_sorted = issuers_df.iloc[-1].sort_values(ascending=False)
     issuers_df = issuers_df[issuers_df_last_row_sorted.index]
     
-    # Creation of plot figure:
-    fig, ax1 = plt.subplots(figsize=(12, 7.4))
-    fig.patch.set_alpha(0.0)
-    fig.patch.set_facecolor('none')
-    ax1.grid(True, axis = 'both', linestyle="dashed", linewidth=0.5, alpha=0.7)
-    ax2 = ax1.twinx()
-    ax3 = ax1.twinx()
+    # Update of plot template with period data. Dates are placed at integer positions
+    # and shown as tick labels, so template axis don't collect dates of previous renders:
+    template = get_plot_template('etfs', build_etfs_template)
+    fig = template['figure']
+    ax1, ax2, ax3 = template['axes']
+    line_holdings_btc, line_holdings_usd = template['lines']
+    plot_colors = template['colors']
+    axis_positions = np.arange(len(axis_date))
 
-    # Set axes lines to change width depending on days period:
-    ax1.plot(axis_date, axis_holdings_btc, color=plot_colors['btc'], label="btc", alpha=0.9, linewidth=14)
-    ax2.plot(axis_date, axis_holdings_usd, color=plot_colors['usd'], label="usd", linewidth=10)
+    line_holdings_btc.set_data(axis_positions, axis_holdings_btc)
+    line_holdings_usd.set_data(axis_positions, axis_holdings_usd)
 
-    # Set stacked area colors:
-    issuers_colors = plot_colors['areas']
-    ax3.stackplot(axis_date, issuers_df.T, colors=issuers_colors)
+    # Set stacked area of period (stackplot has no set_data, so its polygons are replaced):
+    replace_template_fills(template, ax3.stackplot(axis_positions, issuers_df.T, colors=plot_colors['areas']))
 
     # Set axes borders for better scaling:
-    ax1.set_xlim(axis_date.iloc[0], axis_date.iloc[-1])
-    ax3.set_ylim(0, 100)
+    ax1.set_xlim(axis_positions[0], axis_positions[-1])
+    for ax in (ax1, ax2):
+        ax.relim()
+        ax.autoscale_view(scalex=False)
 
-    # Set axes text format:
-    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    
     # Set date axis ticks and text properties:
     date_range_indexes = np.linspace(0, len(axis_date) - 1, num=7, dtype=int)
     ax1.set_xticks(date_range_indexes[0::])
     ax1.set_xticklabels([axis_date[i] for i in date_range_indexes], rotation=10, ha='center')
-    plt.setp(ax1.get_xticklabels(), rotation=10, ha='center')
-
-    # Set axes ticks text color, font and size:
-    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
-    ax1.tick_params(axis="y", labelcolor=plot_colors['btc'])
-    ax2.tick_params(axis="y", labelcolor=plot_colors['usd'])
+    setp(ax1.get_xticklabels(), rotation=10, ha='center')
 
     for label in ax1.get_xticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(12)
 
     for label in ax1.get_yticklabels() + ax2.get_yticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(18)
 
     for label in ax3.get_yticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(1)
 
-    # Set axes order (higher value puts layer to the front):
-    ax1.set_zorder(3)
-    ax2.set_zorder(2)
-    ax3.set_zorder(1)
-
-    # Set plot and stacked area legend proxies:
+    # Set plot and stacked area legend proxies. Legend is made by every render because
+    # top issuers depend on period:
     plot_legend_proxy_btc = Line2D([0], [0], label=f'Holdings, BTC')
     plot_legend_proxy_usd = Line2D([0], [0], label='Holdings, USD')
     plot_legend_list = [plot_legend_proxy_btc, plot_legend_proxy_usd]
@@ -174,10 +210,10 @@ def draw_etfs(days=config.days['etfs']):
         issuer_percent = format_percentage(issuers_df[issuer].iloc[-1])[1:]
         plot_legend_issuer = Line2D([0], [0], label=f'{issuer_percent} {issuer}')
         plot_legend_list.insert(2, plot_legend_issuer)
-        
+
     # Set actual plot and stacked area legend:
-    plot_legend = ax1.legend(handles=plot_legend_list, loc="upper left", prop=plot_font, handlelength=0)
-    
+    plot_legend = ax1.legend(handles=plot_legend_list, loc="upper left", prop=template['font'], handlelength=0)
+
     # Set plot and stacked area legend colors:
     plot_legend.get_texts()[0].set_color(plot_colors['btc'])
     plot_legend.get_texts()[1].set_color(plot_colors['usd'])
@@ -194,13 +230,11 @@ def draw_etfs(days=config.days['etfs']):
     for text in plot_legend.get_texts():
         text.set_fontsize(16)
 
-    # Open memory buffer and save plot to memory buffer:
-    areas_buffer = io.BytesIO()
-    plt.savefig(areas_buffer, format='png', bbox_inches='tight', transparent=True, dpi=150)
-    matplotlib.pyplot.close()
+    # Render plot to image straight from figure canvas:
+    areas_image = render_figure_image(fig, dpi=150)
 
-    # Open background image, draw Lightning title and save image to memory buffer:
-    title_image = Image.open(background_path)
+    # Copy decoded background image and draw Lightning title:
+    title_image = get_background(background_path)
     draw = ImageDraw.Draw(title_image)
 
     # Lightning title related variables:
@@ -218,24 +252,13 @@ def draw_etfs(days=config.days['etfs']):
             text = param.get('text')
             position = param.get('position')
             size = param.get('font_size')
-            font = ImageFont.truetype(title_font, size)
+            font = get_font(title_font, size)
             text_color = param.get('text_color')
 
             draw.text(position, text, font=font, fill=text_color)
 
-    title_buffer = io.BytesIO()
-    title_image.save(title_buffer, 'PNG')
-
-    # Overlay plot buffer with Lightning title buffer and save final image:
-    background_image = Image.open(title_buffer).convert("RGB")
-    title_buffer.seek(0)
-    background_overlay = Image.open(areas_buffer)
-    areas_buffer.seek(0)
-
-    background_image.paste(background_overlay, background_coordinates, mask=background_overlay)
-    background_image.save(plot_file, "JPEG", quality=90, icc_profile=background_image.info.get('icc_profile', ''))
-    title_buffer.close()
-    areas_buffer.close()
+    # Overlay plot image on Lightning title image and save final image:
+    save_plot_image(title_image, areas_image, background_coordinates, plot_file)
     
     main_logger.info(f'{plot_file} drawn')
 
@@ -243,6 +266,7 @@ def draw_etfs(days=config.days['etfs']):
 
 
 @error_handler_common
+@cache_render('etfs')
 def write_etfs(days=1):
     
     # User configuration related variables:
@@ -250,14 +274,9 @@ def write_etfs(days=1):
     etfs_chart_file_path = etfs_chart['file']['path']
     etfs_chart_file_name = etfs_chart['file']['name']
     etfs_chart_file = etfs_chart_file_path + etfs_chart_file_name
-
-    network_snapshot = config.snapshots['network']
-    network_snapshot_file_path = network_snapshot['file']['path']
-    network_snapshot_file_name = network_snapshot['file']['name']
-    network_snapshot_file = network_snapshot_file_path + network_snapshot_file_name
         
     # Create plot DataFrame:
-    etfs_chart_df = pd.read_csv(etfs_chart_file)
+    etfs_chart_df = load_chart('etfs')
     etfs_chart_df = etfs_chart_df.sort_values(by='time')
 
     holdings_btc_df = etfs_chart_df.groupby('time')['tvl'].sum().reset_index() # group items on time collumn and sum TVL for each date
@@ -291,11 +310,10 @@ def write_etfs(days=1):
     HOLDINGS_USD_ATH = format_amount(usd_df.max(), config.currency_vs_ticker)
     HOLDINGS_USD_ATH_DATE = holdings_btc_df['time'].loc[usd_df.idxmax()][:10]
 
-    with open (network_snapshot_file, 'r') as network_file:
-        network_data = json.load(network_file)
-        network_btc_supply = network_data['totalbc'] / 100_000_000
-        SUPPLY_BTC_CURRENT = format_amount(network_btc_supply, config.currency_crypto_ticker)
-        SUPPLY_BTC_CURRENT_PERCENTAGE = format_percentage(btc_df[now] / network_btc_supply * 100)[1:]
+    network_data = get_snapshot('network')
+    network_btc_supply = network_data['totalbc'] / 100_000_000
+    SUPPLY_BTC_CURRENT = format_amount(network_btc_supply, config.currency_crypto_ticker)
+    SUPPLY_BTC_CURRENT_PERCENTAGE = format_percentage(btc_df[now] / network_btc_supply * 100)[1:]
 
     HOLDINGS_BTC_NOW_AMOUNT = format_amount(btc_df[now], config.currency_crypto_ticker) 
     HOLDINGS_BTC_PAST_AMOUNT = format_amount(btc_df[past], config.currency_crypto_ticker) 
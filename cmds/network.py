@@ -1,24 +1,28 @@
 import os
-import io
 import sys
-import json
 import math
 import numpy as np
-import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 
 from matplotlib.lines import Line2D
+from matplotlib.artist import setp
 from matplotlib.ticker import FuncFormatter
 from matplotlib import font_manager
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 from datetime import datetime, timedelta
 
 sys.path.append('.')
 import config
 from logger import main_logger
+from store import get_snapshot, load_chart
 from tools import (error_handler_common,
+                   make_figure,
+                   get_plot_template,
+                   replace_template_fills,
+                   downsample_plot_line,
+                   render_figure_image,
+                   save_plot_image,
                    define_key_metric_movement,
                    calculate_percentage_change,
                    convert_timestamp_to_utc,
@@ -28,6 +32,10 @@ from tools import (error_handler_common,
                    format_currency,
                    format_percentage,
                    format_quantity)
+from cache import cache_render
+from render import farm_render
+from stats import get_rolling_mean
+from assets import get_background, get_font
 
 
 
@@ -44,6 +52,73 @@ Markdown based on snapshot and chart values and formatted for user presentation.
 
 
 @error_handler_common
+def build_network_template():
+    # Builds Network figure template: axes, lines, formatters, ticks colors, axes order and
+    # legend. Template is built once per thread, renders only update data and limits.
+    plot = config.images['network']
+    plot_font = font_manager.FontProperties(fname=plot['font'])
+    plot_colors = plot['colors']
+    template = {'days': config.days['network'], 'font': plot_font, 'colors': plot_colors, 'fills': []}
+
+    # Creation of plot figure:
+    fig = make_figure(figsize=(12, 7.4))
+    ax1 = fig.subplots()
+    fig.patch.set_alpha(0.0)
+    fig.patch.set_facecolor('none')
+    ax1.grid(True, linestyle="dashed", linewidth=0.5, alpha=0.7)
+    ax2 = ax1.twinx()
+    ax3 = ax1.twinx()
+
+    line_trx_per_block, = ax1.plot([], [], color=plot_colors['trx_per_block'], label="trx_per_block")
+    line_hashrate, = ax2.plot([], [], color=plot_colors['hashrate'], label="hashrate")
+    line_price, = ax3.plot([], [], color=plot_colors['price'], label="price", alpha=0.0, linewidth=0.0)
+
+    # Set axes text format, date format depends on days period of current render:
+    ax1.xaxis.set_major_formatter(FuncFormatter(lambda x, _: format_time_axis(x, template['days'])))
+    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+
+    # Set axes ticks text color and visability:
+    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
+    ax1.tick_params(axis="y", labelcolor=plot_colors['trx_per_block'])
+    ax2.tick_params(axis="y", labelcolor=plot_colors['hashrate'])
+    ax3.set_yticks([])
+
+    # Set axes order (higher value puts layer to the front):
+    ax1.set_zorder(3)
+    ax2.set_zorder(2)
+    ax3.set_zorder(1)
+
+    # Set plot legend proxies and actual legend:
+    legend_proxy_trx_per_block = Line2D([0], [0], label=f'TXs/Block')
+    legend_proxy_hashrate = Line2D([0], [0], label='Hashrate, TH/s')
+    legend_proxy_price = Line2D([0], [0], label=f'Price, {config.currency_vs_ticker}')
+
+    legend = ax1.legend(handles=[legend_proxy_trx_per_block,
+                                 legend_proxy_hashrate,
+                                 legend_proxy_price],
+                                 loc="upper left",
+                                 prop=plot_font,
+                                 handlelength=0)
+
+    # Set legend colors:
+    legend.get_texts()[0].set_color(plot_colors['trx_per_block'])
+    legend.get_texts()[1].set_color(plot_colors['hashrate'])
+    legend.get_texts()[2].set_color(plot_colors['price'])
+    legend.get_frame().set_facecolor(plot_colors['frame'])
+    legend.get_frame().set_alpha(0.7)
+
+    # Set legend text size:
+    for text in legend.get_texts():
+        text.set_fontsize(16)
+
+    template.update({'figure': fig, 'axes': (ax1, ax2, ax3), 'lines': (line_trx_per_block, line_hashrate, line_price)})
+    return template
+
+
+@error_handler_common
+@cache_render('network')
+@farm_render('network')
 def draw_network(days=config.days['network']):
     # Draws Network plot with properties specified in user configuration.
     
@@ -55,12 +130,10 @@ def draw_network(days=config.days['network']):
 
     # Plot-related variables:
     plot = config.images['network']
-    plot_font = font_manager.FontProperties(fname=plot['font'])
-    plot_colors = plot['colors']
     plot_background = plot['backgrounds']
         
     # Creation of plot DataFrame:
-    plot_df = pd.read_csv(chart_file)
+    plot_df = load_chart('network')
 
     # Set days value limits and image file name:
     if isinstance(days, int):
@@ -98,17 +171,16 @@ def draw_network(days=config.days['network']):
 
     # Creation of plot axes:
     axis_date = plot_df['date'][plot_index_first:plot_index_last]
-    axis_trx_per_block = plot_df['trx_per_block'].rolling(window=rolling_average).mean()[plot_index_first:plot_index_last]
-    axis_hashrate = plot_df['hashrate'].rolling(window=rolling_average).mean()[plot_index_first:plot_index_last]
+    axis_trx_per_block = get_rolling_mean(chart_file, 'trx_per_block', plot_df['trx_per_block'], rolling_average, plot_index_first, plot_index_last)
+    axis_hashrate = get_rolling_mean(chart_file, 'hashrate', plot_df['hashrate'], rolling_average, plot_index_first, plot_index_last)
     axis_price = plot_df['price'][plot_index_first:plot_index_last]
 
-    # Creation of plot figure:
-    fig, ax1 = plt.subplots(figsize=(12, 7.4))
-    fig.patch.set_alpha(0.0)
-    fig.patch.set_facecolor('none')
-    ax1.grid(True, linestyle="dashed", linewidth=0.5, alpha=0.7)
-    ax2 = ax1.twinx()
-    ax3 = ax1.twinx()
+    # Update of plot template with period data:
+    template = get_plot_template('network', build_network_template)
+    fig = template['figure']
+    ax1, ax2, ax3 = template['axes']
+    line_trx_per_block, line_hashrate, line_price = template['lines']
+    template['days'] = days
 
     # Set axes lines to change width depending on days period:
     linewidth_trx_per_block = 14 - days * 0.01
@@ -118,79 +190,48 @@ def draw_network(days=config.days['network']):
     if linewidth_hashrate < 6:
         linewidth_hashrate = 6
 
-    ax1.plot(axis_date, axis_trx_per_block, color=plot_colors['trx_per_block'], label="trx_per_block", linewidth=linewidth_trx_per_block)
-    ax2.plot(axis_date, axis_hashrate, color=plot_colors['hashrate'], label="hashrate", linewidth=linewidth_hashrate)
-    ax3.plot(axis_date, axis_price, color=plot_colors['price'], label="price", alpha=0.0, linewidth=0.0)
+    # Lines of long periods are downsampled to plot width:
+    plot_trx_per_block = downsample_plot_line(axis_date, axis_trx_per_block)
+    plot_hashrate = downsample_plot_line(axis_date, axis_hashrate)
+    plot_price = downsample_plot_line(axis_date, axis_price)
+
+    line_trx_per_block.set_data(*plot_trx_per_block)
+    line_trx_per_block.set_linewidth(linewidth_trx_per_block)
+    line_hashrate.set_data(*plot_hashrate)
+    line_hashrate.set_linewidth(linewidth_hashrate)
+    line_price.set_data(*plot_price)
 
     # Set axes left and right borders to first and last date of period. Bottom
     # and top borders are set to 95% of plot values for better scaling.
-    ax1.set_xlim(axis_date.iloc[0], axis_date.iloc[-1])  
+    ax1.set_xlim(axis_date.iloc[0], axis_date.iloc[-1])
+    for ax in (ax1, ax2):
+        ax.relim()
+        ax.autoscale_view(scalex=False)
 #    ax1.set_ylim(min(axis_trx_per_block) * 0.95, max(axis_trx_per_block) * 1.05)
 #    ax2.set_ylim(min(axis_hashrate) * 0.95, max(axis_hashrate) * 1.05)
     ax3.set_ylim(min(axis_price) * 0.95, max(axis_price) * 1.05)
 
-    # Set axes text format:
-    ax1.xaxis.set_major_formatter(FuncFormatter(lambda x, _: format_time_axis(x, days)))
-    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    
     # Set date axis ticks and text properties:
-    axis_date_ticks_positions = np.linspace(axis_date.iloc[0], axis_date.iloc[-1], num=7) 
+    axis_date_ticks_positions = np.linspace(axis_date.iloc[0], axis_date.iloc[-1], num=7)
     ax1.set_xticks(axis_date_ticks_positions)
-    plt.setp(ax1.get_xticklabels(), rotation=10, ha='center')
-
-    # Set axes ticks text color, font and size:
-    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
-    ax1.tick_params(axis="y", labelcolor=plot_colors['trx_per_block'])
-    ax2.tick_params(axis="y", labelcolor=plot_colors['hashrate'])
-    ax3.set_yticks([])
+    setp(ax1.get_xticklabels(), rotation=10, ha='center')
 
     for label in ax1.get_xticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(12)
 
     for label in ax1.get_yticklabels() + ax2.get_yticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(18)
 
-    # Set axes order (higher value puts layer to the front):
-    ax1.set_zorder(3)
-    ax2.set_zorder(2)
-    ax3.set_zorder(1)
-    
-    # Set axes color filling and ticks visability:
-    ax3.fill_between(axis_date, axis_price, color=plot_colors['price'], alpha=0.8)
-
-    # Set plot legend proxies and actual legend:
-    legend_proxy_trx_per_block = Line2D([0], [0], label=f'TXs/Block')
-    legend_proxy_hashrate = Line2D([0], [0], label='Hashrate, TH/s')
-    legend_proxy_price = Line2D([0], [0], label=f'Price, {config.currency_vs_ticker}')
-
-    legend = ax1.legend(handles=[legend_proxy_trx_per_block,
-                                 legend_proxy_hashrate,
-                                 legend_proxy_price],
-                                 loc="upper left",
-                                 prop=plot_font,
-                                 handlelength=0)
-    
-    # Set legend colors:
-    legend.get_texts()[0].set_color(plot_colors['trx_per_block'])
-    legend.get_texts()[1].set_color(plot_colors['hashrate'])
-    legend.get_texts()[2].set_color(plot_colors['price'])
-    legend.get_frame().set_facecolor(plot_colors['frame'])
-    legend.get_frame().set_alpha(0.7)
-    
-    # Set legend text size:
-    for text in legend.get_texts():
-        text.set_fontsize(16)
+    # Set axes color filling:
+    replace_template_fills(template, [ax3.fill_between(*plot_price, color=template['colors']['price'], alpha=0.8)])
 
-    # Open memory buffer and save plot to memory buffer:
-    plot_buffer = io.BytesIO()
-    plt.savefig(plot_buffer, format='png', bbox_inches='tight', transparent=True, dpi=150)
-    matplotlib.pyplot.close()
+    # Render plot to image straight from figure canvas:
+    plot_image = render_figure_image(fig, dpi=150)
 
-    # Open background image, draw Network title and save image to memory buffer:
-    title_image = Image.open(background_path)
+    # Copy decoded background image and draw Network title:
+    title_image = get_background(background_path)
     draw = ImageDraw.Draw(title_image)
 
     # Network title related variables:
@@ -208,24 +249,13 @@ def draw_network(days=config.days['network']):
             text = param.get('text')
             position = param.get('position')
             size = param.get('font_size')
-            font = ImageFont.truetype(title_font, size)
+            font = get_font(title_font, size)
             text_color = param.get('text_color')
 
             draw.text(position, text, font=font, fill=text_color)
 
-    title_buffer = io.BytesIO()
-    title_image.save(title_buffer, 'PNG')
-
-    # Overlay plot buffer with Network title buffer and save final image:
-    background_image = Image.open(title_buffer).convert("RGB")
-    title_buffer.seek(0)
-    background_overlay = Image.open(plot_buffer)
-    plot_buffer.seek(0)
-
-    background_image.paste(background_overlay, background_coordinates, mask=background_overlay)
-    background_image.save(plot_file, "JPEG", quality=90, icc_profile=background_image.info.get('icc_profile', ''))
-    title_buffer.close()
-    plot_buffer.close()
+    # Overlay plot image on Network title image and save final image:
+    save_plot_image(title_image, plot_image, background_coordinates, plot_file)
 
     main_logger.info(f'{plot_file} drawn')
 
@@ -233,14 +263,13 @@ def draw_network(days=config.days['network']):
 
 
 @error_handler_common
+@cache_render('network')
 def write_network(days=1):
     # Writes Network markdown with properties specified in user configuration.
 
     # User configuration related variables:
     snapshot = config.snapshots['network']
     snapshot_file_path = snapshot['file']['path']
-    snapshot_file_name = snapshot['file']['name']
-    snapshot_file = snapshot_file_path + snapshot_file_name
 
     markdown_file = snapshot_file_path + 'network.md'
 
@@ -249,7 +278,7 @@ def write_network(days=1):
     chart_file_name = chart['file']['name']
     chart_file = chart_file_path + chart_file_name
     
-    chart_data = pd.read_csv(chart_file)
+    chart_data = load_chart('network')
     chart_date = chart_data['date']
     chart_price = chart_data['price']
     chart_hashrate = chart_data['hashrate']
@@ -266,99 +295,97 @@ def write_network(days=1):
     past = len(chart_data) - days
     markdown_file = chart_file_path + f'network_days_{days}.md'
 
-    with open (snapshot_file, 'r') as json_file:
-        
-        snapshot_data = json.load(json_file)
-
-        # Parse raw API data to separate values:
-        LAST_UPDATED = convert_timestamp_to_utc(snapshot_data['timestamp'])
-
-        TIME_NOW = convert_timestamp_to_utc(chart_date[now])[:10]
-        TIME_PAST = convert_timestamp_to_utc(chart_date[past])[:10]
-
-        BLOCKS_HEIGHT = format_quantity(snapshot_data['n_blocks_total'])
-        BLOCKS_MINED = format_quantity(snapshot_data['n_blocks_mined'])
-        BLOCKS_SIZE = round(snapshot_data['blocks_size'] / (1_024**2) / int(BLOCKS_MINED), 2)
-        BLOCKS_MINUTES = round(snapshot_data['minutes_between_blocks'], 1)
-
-        BTC_SUPPLY = format_currency(snapshot_data['totalbc'] / 100_000_000, config.currency_crypto_ticker, decimal=0)
-        BTC_MINED = format_currency(snapshot_data['n_btc_mined'] / 100_000_000, config.currency_crypto_ticker)
-        BTC_SENT = format_currency(snapshot_data['total_btc_sent'] / 100_000_000, config.currency_crypto_ticker, decimal=0)
-        BTC_PRICE = format_currency(snapshot_data['market_price_usd'], config.currency_vs_ticker, decimal=2)
-
-        TRANSACTIONS_BLOCK = round(chart_trx_per_block.iloc[-1], 2)
-        TRANSACTIONS_MADE = format_quantity(snapshot_data['n_tx'])
-        TRANSACTIONS_COST = format_currency(chart_trx_per_block.iloc[-1], config.currency_vs_ticker, decimal=2)
-
-        HASHRATE = format_amount(snapshot_data['hash_rate'] / 1_000)
-        DIFFICULTY = format_amount(snapshot_data['difficulty'])
-        RETARGET_HEIGHT = format_quantity(snapshot_data['nextretarget'])
-        RETARGET_IN = format_quantity(snapshot_data['nextretarget'] - snapshot_data['n_blocks_total'])
-
-        PRICE_NOW = format_currency(chart_price[now], config.currency_vs_ticker, decimal=2)
-        PRICE_PAST = format_currency(chart_price[past], config.currency_vs_ticker, decimal=2)
-        PRICE_PAST_CHANGE = format_currency(chart_price[now] - chart_price[past], config.currency_vs_ticker, decimal=2)
-        PRICE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_price[past], chart_price[now]))
-
-        HASHRATE_NOW = format_amount(chart_hashrate[now])
-        HASHRATE_PAST = format_amount(chart_hashrate[past])
-        HASHRATE_PAST_CHANGE = format_amount((chart_hashrate[now] - chart_hashrate[past]))
-        HASHRATE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_hashrate[past], chart_hashrate[now]))
-
-        TRX_PER_BLOCK_NOW = format_amount(chart_trx_per_block[now])
-        TRX_PER_BLOCK_PAST = format_amount(chart_trx_per_block[past])
-        TRX_PER_BLOCK_PAST_CHANGE = format_amount(chart_trx_per_block[now] - chart_trx_per_block[past])
-        TRX_PER_BLOCK_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_trx_per_block[past], chart_trx_per_block[now]))
-
-        BLOCKCHAIN_SIZE_NOW = format_bytes(chart_blockchain_size[now], 'MB')
-        BLOCKCHAIN_SIZE_PAST = format_bytes(chart_blockchain_size[past], 'MB')
-        BLOCKCHAIN_SIZE_PAST_CHANGE = format_bytes(chart_blockchain_size[now] - chart_blockchain_size[past], 'MB')
-        BLOCKCHAIN_SIZE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_blockchain_size[past], chart_blockchain_size[now]))
-    
-        # Format values text for user presentation:
-        if days == 1:
-            info_blocks = \
-                f'Block Height: {BLOCKS_HEIGHT}\n' \
-                f'24h Mined: {BLOCKS_MINED} blocks\n' \
-                f'24h Size: {BLOCKS_SIZE} MB/block\n' \
-                f'24h Time: {BLOCKS_MINUTES} min/block\n'
-            info_coin = \
-                f'Supply: {BTC_SUPPLY}\n' \
-                f'24h Mined: {BTC_MINED}\n' \
-                f'24h Sent: {BTC_SENT}\n' \
-                f'24h Price: {BTC_PRICE}\n'
-            info_transactions = \
-                f'Blockchain: {BLOCKCHAIN_SIZE_NOW}\n' \
-                f'24h Tx: {TRANSACTIONS_MADE}\n' \
-                f'24h Avg: {TRANSACTIONS_BLOCK} tx/block\n' \
-                f'24h Cost: {TRANSACTIONS_COST}/tx\n'
-            info_network = \
-                f'Current Target: {DIFFICULTY}\n' \
-                f'Retarget: {RETARGET_IN} blocks\n' \
-                f'Hashrate: {HASHRATE} TH/s\n'
-            info_update = f'UTC {LAST_UPDATED}\n'
-
-            # Write latest values to Markdown file:
-            with open (markdown_file, 'w') as markdown:
-                markdown.write(f'```Network\n{info_blocks}\n{info_coin}\n{info_transactions}\n{info_network}\n{info_update}```')
-        else:
-            info_period = f'{TIME_PAST} --> {TIME_NOW}\n'
-            info_trx_per_block = \
-                f'Avg tx/block: {TRX_PER_BLOCK_PAST} --> {TRX_PER_BLOCK_NOW}\n' \
-                f'{days}d: {TRX_PER_BLOCK_PAST_CHANGE_PERCENTAGE} ({TRX_PER_BLOCK_PAST_CHANGE}/block)\n'
-            info_hashrate = \
-                f'Hashrate: {HASHRATE_PAST} TH/s --> {HASHRATE_NOW} TH/s\n' \
-                f'{days}d: {HASHRATE_PAST_CHANGE_PERCENTAGE} ({HASHRATE_PAST_CHANGE} TH/s)\n'
-            info_blockchain_size = \
-                f'Blockchain: {BLOCKCHAIN_SIZE_PAST} --> {BLOCKCHAIN_SIZE_NOW}\n' \
-                f'{days}d: {BLOCKCHAIN_SIZE_PAST_CHANGE_PERCENTAGE} ({BLOCKCHAIN_SIZE_PAST_CHANGE})\n'
-            info_price = \
-                f'Price: {PRICE_PAST} --> {PRICE_NOW}\n' \
-                f'{days}d: {PRICE_PAST_CHANGE_PERCENTAGE} ({PRICE_PAST_CHANGE})\n'
-            
-            # Write latest values to Markdown file:
-            with open (markdown_file, 'w') as markdown:
-                markdown.write(f'```Network\n{info_period}\n{info_trx_per_block}\n{info_hashrate}\n{info_blockchain_size}\n{info_price}```')
+    snapshot_data = get_snapshot('network')
+
+    # Parse raw API data to separate values:
+    LAST_UPDATED = convert_timestamp_to_utc(snapshot_data['timestamp'])
+
+    TIME_NOW = convert_timestamp_to_utc(chart_date[now])[:10]
+    TIME_PAST = convert_timestamp_to_utc(chart_date[past])[:10]
+
+    BLOCKS_HEIGHT = format_quantity(snapshot_data['n_blocks_total'])
+    BLOCKS_MINED = format_quantity(snapshot_data['n_blocks_mined'])
+    BLOCKS_SIZE = round(snapshot_data['blocks_size'] / (1_024**2) / int(BLOCKS_MINED), 2)
+    BLOCKS_MINUTES = round(snapshot_data['minutes_between_blocks'], 1)
+
+    BTC_SUPPLY = format_currency(snapshot_data['totalbc'] / 100_000_000, config.currency_crypto_ticker, decimal=0)
+    BTC_MINED = format_currency(snapshot_data['n_btc_mined'] / 100_000_000, config.currency_crypto_ticker)
+    BTC_SENT = format_currency(snapshot_data['total_btc_sent'] / 100_000_000, config.currency_crypto_ticker, decimal=0)
+    BTC_PRICE = format_currency(snapshot_data['market_price_usd'], config.currency_vs_ticker, decimal=2)
+
+    TRANSACTIONS_BLOCK = round(chart_trx_per_block.iloc[-1], 2)
+    TRANSACTIONS_MADE = format_quantity(snapshot_data['n_tx'])
+    TRANSACTIONS_COST = format_currency(chart_trx_per_block.iloc[-1], config.currency_vs_ticker, decimal=2)
+
+    HASHRATE = format_amount(snapshot_data['hash_rate'] / 1_000)
+    DIFFICULTY = format_amount(snapshot_data['difficulty'])
+    RETARGET_HEIGHT = format_quantity(snapshot_data['nextretarget'])
+    RETARGET_IN = format_quantity(snapshot_data['nextretarget'] - snapshot_data['n_blocks_total'])
+
+    PRICE_NOW = format_currency(chart_price[now], config.currency_vs_ticker, decimal=2)
+    PRICE_PAST = format_currency(chart_price[past], config.currency_vs_ticker, decimal=2)
+    PRICE_PAST_CHANGE = format_currency(chart_price[now] - chart_price[past], config.currency_vs_ticker, decimal=2)
+    PRICE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_price[past], chart_price[now]))
+
+    HASHRATE_NOW = format_amount(chart_hashrate[now])
+    HASHRATE_PAST = format_amount(chart_hashrate[past])
+    HASHRATE_PAST_CHANGE = format_amount((chart_hashrate[now] - chart_hashrate[past]))
+    HASHRATE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_hashrate[past], chart_hashrate[now]))
+
+    TRX_PER_BLOCK_NOW = format_amount(chart_trx_per_block[now])
+    TRX_PER_BLOCK_PAST = format_amount(chart_trx_per_block[past])
+    TRX_PER_BLOCK_PAST_CHANGE = format_amount(chart_trx_per_block[now] - chart_trx_per_block[past])
+    TRX_PER_BLOCK_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_trx_per_block[past], chart_trx_per_block[now]))
+
+    BLOCKCHAIN_SIZE_NOW = format_bytes(chart_blockchain_size[now], 'MB')
+    BLOCKCHAIN_SIZE_PAST = format_bytes(chart_blockchain_size[past], 'MB')
+    BLOCKCHAIN_SIZE_PAST_CHANGE = format_bytes(chart_blockchain_size[now] - chart_blockchain_size[past], 'MB')
+    BLOCKCHAIN_SIZE_PAST_CHANGE_PERCENTAGE = format_percentage(calculate_percentage_change(chart_blockchain_size[past], chart_blockchain_size[now]))
+
+    # Format values text for user presentation:
+    if days == 1:
+        info_blocks = \
+            f'Block Height: {BLOCKS_HEIGHT}\n' \
+            f'24h Mined: {BLOCKS_MINED} blocks\n' \
+            f'24h Size: {BLOCKS_SIZE} MB/block\n' \
+            f'24h Time: {BLOCKS_MINUTES} min/block\n'
+        info_coin = \
+            f'Supply: {BTC_SUPPLY}\n' \
+            f'24h Mined: {BTC_MINED}\n' \
+            f'24h Sent: {BTC_SENT}\n' \
+            f'24h Price: {BTC_PRICE}\n'
+        info_transactions = \
+            f'Blockchain: {BLOCKCHAIN_SIZE_NOW}\n' \
+            f'24h Tx: {TRANSACTIONS_MADE}\n' \
+            f'24h Avg: {TRANSACTIONS_BLOCK} tx/block\n' \
+            f'24h Cost: {TRANSACTIONS_COST}/tx\n'
+        info_network = \
+            f'Current Target: {DIFFICULTY}\n' \
+            f'Retarget: {RETARGET_IN} blocks\n' \
+            f'Hashrate: {HASHRATE} TH/s\n'
+        info_update = f'UTC {LAST_UPDATED}\n'
+
+        # Write latest values to Markdown file:
+        with open (markdown_file, 'w') as markdown:
+            markdown.write(f'```Network\n{info_blocks}\n{info_coin}\n{info_transactions}\n{info_network}\n{info_update}```')
+    else:
+        info_period = f'{TIME_PAST} --> {TIME_NOW}\n'
+        info_trx_per_block = \
+            f'Avg tx/block: {TRX_PER_BLOCK_PAST} --> {TRX_PER_BLOCK_NOW}\n' \
+            f'{days}d: {TRX_PER_BLOCK_PAST_CHANGE_PERCENTAGE} ({TRX_PER_BLOCK_PAST_CHANGE}/block)\n'
+        info_hashrate = \
+            f'Hashrate: {HASHRATE_PAST} TH/s --> {HASHRATE_NOW} TH/s\n' \
+            f'{days}d: {HASHRATE_PAST_CHANGE_PERCENTAGE} ({HASHRATE_PAST_CHANGE} TH/s)\n'
+        info_blockchain_size = \
+            f'Blockchain: {BLOCKCHAIN_SIZE_PAST} --> {BLOCKCHAIN_SIZE_NOW}\n' \
+            f'{days}d: {BLOCKCHAIN_SIZE_PAST_CHANGE_PERCENTAGE} ({BLOCKCHAIN_SIZE_PAST_CHANGE})\n'
+        info_price = \
+            f'Price: {PRICE_PAST} --> {PRICE_NOW}\n' \
+            f'{days}d: {PRICE_PAST_CHANGE_PERCENTAGE} ({PRICE_PAST_CHANGE})\n'
+
+        # Write latest values to Markdown file:
+        with open (markdown_file, 'w') as markdown:
+            markdown.write(f'```Network\n{info_period}\n{info_trx_per_block}\n{info_hashrate}\n{info_blockchain_size}\n{info_price}```')
 
     main_logger.info(f'{markdown_file} written')
 
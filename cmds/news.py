@@ -1,13 +1,12 @@
 import os
 import sys
-import requests
 
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 
 sys.path.append('.')
 import config
-from tools import error_handler_common
+from tools import error_handler_common, get_api_data
 from logger import main_logger
 
 
@@ -21,7 +20,7 @@ Markdown based on parsed links.
 
 @error_handler_common
 def write_news():
-    response = requests.get('https://coinqueror.io/?search=bitcoin')
+    response = get_api_data('https://coinqueror.io/', '', {'search': 'bitcoin'})
     soup = BeautifulSoup(response.content, "html.parser")
     headlines = soup.find_all('h2')
     
@@ -1,19 +1,19 @@
-import io
 import os
 import sys
-import json
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib
 
 from matplotlib import font_manager
 from datetime import datetime, timedelta
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
 sys.path.append('.')
 import config
-from tools import error_handler_common, format_quantity
+from tools import error_handler_common, create_figure, render_figure_image, save_plot_image, format_quantity
+from render import farm_render
+from assets import get_background, get_font
 from logger import main_logger
+from store import get_snapshot
 
 
 
@@ -25,6 +25,7 @@ Diagram based on snapshot values.
 
 
 @error_handler_common
+@farm_render('pools')
 def draw_pools():
     # Draws Pools diagram with properties specified in user configuration.
     
@@ -32,7 +33,6 @@ def draw_pools():
     snapshot = config.snapshots['pools']
     snapshot_file_path = snapshot['file']['path']
     snapshot_file_name = snapshot['file']['name']
-    snapshot_subdict = snapshot['file']['subdict']
     snapshot_file = snapshot_file_path + snapshot_file_name
     snapshot_time_till = datetime.utcfromtimestamp(os.path.getctime(snapshot_file)).strftime('%Y-%m-%d')
     snapshot_time_from = (datetime.utcfromtimestamp(os.path.getctime(snapshot_file)) - timedelta(days=7)).strftime('%Y-%m-%d')
@@ -48,8 +48,7 @@ def draw_pools():
     background_colors = diagram['backgrounds']['colors']
     
     # Creation of diagram DataFrame and calculation of additional % column:
-    with open(snapshot_file, 'r') as file:
-        pools_raw_data = json.load(file)[f'{snapshot_subdict}']
+    pools_raw_data = get_snapshot('pools')
 
     pools_block_count = sum(pool['blockCount'] for pool in pools_raw_data)
 
@@ -69,25 +68,24 @@ def draw_pools():
     diagram_df = pd.concat([diagram_df.head(diagram_slices), diagram_other])
 
     # Creation of diagram figure:
-    plt.figure(figsize=(9,9))
-    plt.pie(diagram_df['mined'],
-            autopct='%1.1f%%',
-            startangle=90,
-            counterclock=False,
-            colors=diagram_colors['slices'],
-            textprops={'fontproperties': diagram_font,
-                       'size': 20,
-                       'color': diagram_colors['percentage'],
-                       'ha': 'center'},
-                       explode=(0, 0, 0, 0, 0, 0.1))
-
-    # Open memory buffer and save diagram to memory buffer:
-    diagram_buffer = io.BytesIO()
-    plt.savefig(diagram_buffer, format='png', bbox_inches='tight', transparent=True, dpi=150)
-    matplotlib.pyplot.close()
-
-    # Open background image, draw miners and save image to memory buffer:
-    miners_image = Image.open(background_path)
+    with create_figure(figsize=(9, 9)) as fig:
+        ax = fig.subplots()
+        ax.pie(diagram_df['mined'],
+               autopct='%1.1f%%',
+               startangle=90,
+               counterclock=False,
+               colors=diagram_colors['slices'],
+               textprops={'fontproperties': diagram_font,
+                          'size': 20,
+                          'color': diagram_colors['percentage'],
+                          'ha': 'center'},
+                          explode=(0, 0, 0, 0, 0, 0.1))
+
+        # Render diagram to image straight from figure canvas:
+        diagram_image = render_figure_image(fig, dpi=150)
+
+    # Copy decoded background image and draw miners:
+    miners_image = get_background(background_path)
     draw = ImageDraw.Draw(miners_image)
 
     # Miners-related variables:
@@ -121,24 +119,13 @@ def draw_pools():
             text = miner_params.get('text')
             position = miner_params.get('position')
             size = miner_params.get('font_size')
-            font = ImageFont.truetype(miners_font, size)
+            font = get_font(miners_font, size)
             text_color = miner_params.get('text_color')
 
             draw.text(position, text, font=font, fill=text_color)
 
-    miners_buffer = io.BytesIO()
-    miners_image.save(miners_buffer, 'PNG')
-
-    # Overlay diagram buffer with miners buffer and save final image:
-    background_image = Image.open(miners_buffer).convert("RGB")
-    miners_buffer.seek(0)
-    background_overlay = Image.open(diagram_buffer)
-    diagram_buffer.seek(0)
-
-    background_image.paste(background_overlay, background_coordinates, mask=background_overlay)
-    background_image.save(diagram_file, "JPEG", quality=90, icc_profile=background_image.info.get('icc_profile', ''))
-    miners_buffer.close()
-    diagram_buffer.close()
+    # Overlay diagram image on miners image and save final image:
+    save_plot_image(miners_image, diagram_image, background_coordinates, diagram_file)
 
     main_logger.info(f'{diagram_file} drawn')
 
@@ -1,29 +1,36 @@
-import io
 import os
 import sys
-import json
 import math
 import numpy as np
-import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 
 from matplotlib.lines import Line2D
+from matplotlib.artist import setp
 from matplotlib.ticker import FuncFormatter
 from matplotlib import font_manager
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
 sys.path.append('.')
 import config
 from logger import main_logger
+from store import get_snapshot, load_chart
 from tools import (error_handler_common,
+                   make_figure,
+                   get_plot_template,
+                   replace_template_fills,
+                   render_figure_image,
+                   save_plot_image,
                    define_key_metric_movement,
                    format_amount,
                    format_currency,
                    format_percentage,
                    calculate_percentage_change)
+from cache import cache_render
+from render import farm_render
+from stats import get_rolling_mean
+from assets import get_background, get_font
 
 
 
@@ -40,6 +47,67 @@ Markdown based on snapshot and chart values and formatted for user presentation.
 
 
 @error_handler_common
+def build_seized_template():
+    # Builds Seized figure template: axes, lines, formatters, ticks colors, axes order and
+    # legend. Template is built once per thread, renders only update data and limits.
+    plot = config.images['seized']
+    plot_font = font_manager.FontProperties(fname=plot['font'])
+    plot_colors = plot['colors']
+    template = {'font': plot_font, 'colors': plot_colors, 'fills': []}
+
+    # Creation of plot figure:
+    fig = make_figure(figsize=(12, 7.4))
+    ax1 = fig.subplots()
+    fig.patch.set_alpha(0.0)
+    fig.patch.set_facecolor('none')
+    ax1.grid(True, linestyle="dashed", linewidth=0.5, alpha=0.7)
+    ax2 = ax1.twinx()
+    ax3 = ax1.twinx()
+
+    # Set axes lines:
+    line_btc, = ax1.plot([], [], color=plot_colors['btc'], label="btc", alpha=0.0, linewidth=0.0)
+    line_usd, = ax2.plot([], [], color=plot_colors['usd'], label="usd", alpha=0.0, linewidth=0.0)
+    line_price, = ax3.plot([], [], color=plot_colors['price'], label="btc", linewidth=10)
+
+    # Set axes text format:
+    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
+
+    # Set axes ticks text color and visability:
+    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
+    ax1.tick_params(axis="y", labelcolor=plot_colors['btc'])
+    ax2.tick_params(axis="y", labelcolor=plot_colors['usd'])
+    ax3.set_yticks([])
+
+    # Set axes order (higher value puts layer to the front):
+    ax1.set_zorder(1)
+    ax2.set_zorder(2)
+    ax3.set_zorder(3)
+
+    # Set plot legend proxies and actual legend:
+    legend_proxy_usd = Line2D([0], [0], label=f'Balance, BTC')
+    legend_proxy_btc = Line2D([0], [0], label=f'Balance, USD')
+    legend_proxy_price = Line2D([0], [0], label=f'BTC Price, USD')
+    legend = ax3.legend(handles=[legend_proxy_usd, legend_proxy_btc, legend_proxy_price], loc="upper left", prop=plot_font, handlelength=0)
+
+    # Set legend colors:
+    legend.get_texts()[0].set_color(plot_colors['btc'])
+    legend.get_texts()[1].set_color(plot_colors['usd'])
+    legend.get_texts()[2].set_color(plot_colors['price'])
+    legend.get_frame().set_facecolor(plot_colors['frame'])
+    legend.get_frame().set_alpha(0.7)
+
+    # Set legend text size:
+    for text in legend.get_texts():
+        text.set_fontsize(16)
+
+    template.update({'figure': fig, 'axes': (ax1, ax2, ax3), 'lines': (line_btc, line_usd, line_price)})
+    return template
+
+
+@error_handler_common
+@cache_render('seized')
+@farm_render('seized')
 def draw_seized(days=config.days['seized']):
     # Draws Seized plot with properties specified in user configuration.
     
@@ -51,12 +119,10 @@ def draw_seized(days=config.days['seized']):
 
     # Plot-related variables:
     plot = config.images['seized']
-    plot_font = font_manager.FontProperties(fname=plot['font'])
-    plot_colors = plot['colors']
     plot_background = plot['backgrounds']
         
     # Creation of plot DataFrame:
-    plot_df = pd.read_csv(chart_file)[:-2].sort_index(ascending=False).reset_index()
+    plot_df = load_chart('seized')[:-2].sort_index(ascending=False).reset_index()
 
     # Set time period:
     if isinstance(days, int):
@@ -100,85 +166,53 @@ def draw_seized(days=config.days['seized']):
     axis_date = axis_date[index_period_start:index_period_end].reset_index(drop=True)
     axis_usd = plot_df['USD_Balance'][index_period_start:index_period_end]
     axis_btc = plot_df['BTC_Balance'][index_period_start:index_period_end]
-    axis_price = plot_df['BTC_price'][index_period_start:index_period_end].rolling(window=rolling_average).mean()
+    axis_price = get_rolling_mean(chart_file, 'BTC_price[:-2]_reversed', plot_df['BTC_price'], rolling_average, index_period_start, index_period_end)
 
-    # Creation of plot figure:
-    fig, ax1 = plt.subplots(figsize=(12, 7.4))
-    fig.patch.set_alpha(0.0)
-    fig.patch.set_facecolor('none')
-    ax1.grid(True, linestyle="dashed", linewidth=0.5, alpha=0.7)
-    ax2 = ax1.twinx()
-    ax3 = ax1.twinx()
+    # Update of plot template with period data. Dates are placed at integer positions
+    # and shown as tick labels, so template axis don't collect dates of previous renders:
+    template = get_plot_template('seized', build_seized_template)
+    fig = template['figure']
+    ax1, ax2, ax3 = template['axes']
+    line_btc, line_usd, line_price = template['lines']
+    plot_colors = template['colors']
+    axis_positions = np.arange(len(axis_date))
 
-    # Set axes lines:
-    ax1.plot(axis_date, axis_btc, color=plot_colors['btc'], label="btc", alpha=0.0, linewidth=0.0)
-    ax2.plot(axis_date, axis_usd, color=plot_colors['usd'], label="usd", alpha=0.0, linewidth=0.0)
-    ax3.plot(axis_date, axis_price, color=plot_colors['price'], label="btc", linewidth=10)
+    line_btc.set_data(axis_positions, axis_btc)
+    line_usd.set_data(axis_positions, axis_usd)
+    line_price.set_data(axis_positions, axis_price)
 
     # Set axes left and right borders to first and last date of period. Bottom and top
     # border are set to persentages of axes for better scaling.
-    ax1.set_xlim(axis_date.iloc[0], axis_date.iloc[-1])  
+    ax1.set_xlim(axis_positions[0], axis_positions[-1])
     ax1.set_ylim(min(axis_btc) * 0.95, max(axis_btc) * 1.05)
     ax2.set_ylim(min(axis_usd) * 0.95, max(axis_usd) * 1.05)
+    ax3.relim()
+    ax3.autoscale_view(scalex=False)
 #    ax3.set_ylim(min(axis_price) * 0.75, max(axis_price) * 1.25)
 
-    # Set axes text format:
-    ax1.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    ax2.yaxis.set_major_formatter(FuncFormatter(lambda x, _: format_amount(x)))
-    
     # Set date axis ticks and text properties:
     date_range_indexes = np.linspace(0, len(axis_date) - 1, num=7, dtype=int)
     ax1.set_xticks(date_range_indexes)
     ax1.set_xticklabels([axis_date[i] for i in date_range_indexes], rotation=10, ha='center')
-    plt.setp(ax1.get_xticklabels(), rotation=10, ha='center')
-
-    # Set axes ticks text color, font and size:
-    ax1.tick_params(axis="x", labelcolor=plot_colors['date'])
-    ax1.tick_params(axis="y", labelcolor=plot_colors['btc'])
-    ax2.tick_params(axis="y", labelcolor=plot_colors['usd'])
-    ax3.set_yticks([])
+    setp(ax1.get_xticklabels(), rotation=10, ha='center')
 
     for label in ax1.get_xticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(12)
 
     for label in ax1.get_yticklabels() + ax2.get_yticklabels():
-        label.set_fontproperties(plot_font)
+        label.set_fontproperties(template['font'])
         label.set_fontsize(18)
 
-    # Set axes order (higher value puts layer to the front):
-    ax1.set_zorder(1)
-    ax2.set_zorder(2)
-    ax3.set_zorder(3)
-    
     # Set axes color filling:
-    ax1.fill_between(axis_date, axis_btc, color=plot_colors['btc'], alpha=0.8)
-    ax2.fill_between(axis_date, axis_usd, color=plot_colors['usd'], alpha=0.7)
-
-    # Set plot legend proxies and actual legend:
-    legend_proxy_usd = Line2D([0], [0], label=f'Balance, BTC')
-    legend_proxy_btc = Line2D([0], [0], label=f'Balance, USD')
-    legend_proxy_price = Line2D([0], [0], label=f'BTC Price, USD')
-    legend = ax3.legend(handles=[legend_proxy_usd, legend_proxy_btc, legend_proxy_price], loc="upper left", prop=plot_font, handlelength=0)
-    
-    # Set legend colors:
-    legend.get_texts()[0].set_color(plot_colors['btc'])
-    legend.get_texts()[1].set_color(plot_colors['usd'])
-    legend.get_texts()[2].set_color(plot_colors['price'])
-    legend.get_frame().set_facecolor(plot_colors['frame'])
-    legend.get_frame().set_alpha(0.7)
+    replace_template_fills(template, [ax1.fill_between(axis_positions, axis_btc, color=plot_colors['btc'], alpha=0.8),
+                                      ax2.fill_between(axis_positions, axis_usd, color=plot_colors['usd'], alpha=0.7)])
 
-    # Set legend text size:
-    for text in legend.get_texts():
-        text.set_fontsize(16)
-
-    # Open memory buffer and save plot to memory buffer:
-    plot_buffer = io.BytesIO()
-    plt.savefig(plot_buffer, format='png', bbox_inches='tight', transparent=True, dpi=150)
-    matplotlib.pyplot.close()
+    # Render plot to image straight from figure canvas:
+    plot_image = render_figure_image(fig, dpi=150)
 
-    # Open background image, draw Market title and save image to memory buffer:
-    title_image = Image.open(background_path)
+    # Copy decoded background image and draw Market title:
+    title_image = get_background(background_path)
     draw = ImageDraw.Draw(title_image)
 
     # Seized title related variables:
@@ -196,24 +230,13 @@ def draw_seized(days=config.days['seized']):
             text = param.get('text')
             position = param.get('position')
             size = param.get('font_size')
-            font = ImageFont.truetype(title_font, size)
+            font = get_font(title_font, size)
             text_color = param.get('text_color')
 
             draw.text(position, text, font=font, fill=text_color)
 
-    title_buffer = io.BytesIO()
-    title_image.save(title_buffer, 'PNG')
-
-    # Overlay plot buffer with Seized title buffer and save final image:
-    background_image = Image.open(title_buffer).convert("RGB")
-    title_buffer.seek(0)
-    background_overlay = Image.open(plot_buffer)
-    plot_buffer.seek(0)
-
-    background_image.paste(background_overlay, background_coordinates, mask=background_overlay)
-    background_image.save(plot_file, "JPEG", quality=90, icc_profile=background_image.info.get('icc_profile', ''))
-    title_buffer.close()
-    plot_buffer.close()
+    # Overlay plot image on Seized title image and save final image:
+    save_plot_image(title_image, plot_image, background_coordinates, plot_file)
 
     main_logger.info(f'{plot_file} drawn')
 
@@ -221,6 +244,7 @@ def draw_seized(days=config.days['seized']):
 
 
 @error_handler_common
+@cache_render('seized')
 def write_seized(days=1):
 
     seized_chart = config.charts['seized']
@@ -228,12 +252,7 @@ def write_seized(days=1):
     seized_chart_file_name = seized_chart['file']['name']
     seized_chart_file = seized_chart_file_path + seized_chart_file_name
     
-    network_snapshot = config.snapshots['network']
-    network_snapshot_file_path = network_snapshot['file']['path']
-    network_snapshot_file_name = network_snapshot['file']['name']
-    network_snapshot_file = network_snapshot_file_path + network_snapshot_file_name
-    
-    seized_chart_data = pd.read_csv(seized_chart_file).sort_index(ascending=False).reset_index(drop=True)
+    seized_chart_data = load_chart('seized').sort_index(ascending=False).reset_index(drop=True)
     seized_date = seized_chart_data['day']
     seized_balance_btc = seized_chart_data['BTC_Balance']
     seized_balance_usd = seized_chart_data['USD_Balance']
@@ -263,11 +282,10 @@ def write_seized(days=1):
     ATH_BALANCE_USD = format_amount(seized_balance_usd.max(), config.currency_vs_ticker)
     ATH_BALANCE_USD_DATE = seized_date.loc[seized_balance_usd.idxmax()][:10]
 
-    with open (network_snapshot_file, 'r') as network_file:
-        network_data = json.load(network_file)
-        network_btc_supply = network_data['totalbc'] / 100_000_000
-        SUPPLY_BTC_CURRENT = format_amount(network_btc_supply, config.currency_crypto_ticker)
-        SUPPLY_BTC_CURRENT_PERCENTAGE = format_percentage(seized_balance_btc[now] / network_btc_supply * 100)[1:]
+    network_data = get_snapshot('network')
+    network_btc_supply = network_data['totalbc'] / 100_000_000
+    SUPPLY_BTC_CURRENT = format_amount(network_btc_supply, config.currency_crypto_ticker)
+    SUPPLY_BTC_CURRENT_PERCENTAGE = format_percentage(seized_balance_btc[now] / network_btc_supply * 100)[1:]
 
 
     BALANCE_BTC_NOW_AMOUNT = format_amount(seized_balance_btc[now], config.currency_crypto_ticker) 
@@ -15,6 +15,31 @@ currency_vs_ticker = currency_vs.upper()
 currency_pair = currency_crypto_ticker + currency_vs_ticker
 
 
+# Settings for connections to API providers:
+connections = {
+    'timeout': (5, 30), # seconds to connect and to read response
+    'pool': 4, # connections kept alive per API provider
+    'retries': 3, # repeated calls if response status in {statuses}
+    'backoff': 2, # seconds, doubled with each retry
+    'jitter': 1, # seconds, random addition to backoff
+    'statuses': [429, 500, 502, 503, 504]
+}
+
+
+# Settings for local API stand used to benchmark databases ingest (see stand.py):
+stand = {
+    'mode': False, # False for live API, 'record' to save live API responses to {fixtures}, 'replay' to call stand
+    'host': '127.0.0.1',
+    'port': 8799,
+    'fixtures': 'db/stand/',
+    'databases': 'db/stand/databases/', # databases ingested in 'replay' mode instead of db/
+    'latency': (0.05, 0.25), # seconds, random delay of each stand response
+    'failures': 0.0, # share of stand responses failed with 503
+    'rate': 0, # stand responses per second per API provider before 429, 0 for unlimited
+    'throttle': False # apply {limits} of live API providers to calls to stand
+}
+
+
 # Dictionaries for managing databases:
 charts = {
     'etfs': {
@@ -82,6 +107,10 @@ charts = {
                     'market_caps': 'market_cap',
                     'total_volumes': 'total_volume'
                 }
+            },
+            'accumulate': { # each 1 day download is merged to stored history instead of replacing it
+                'seconds': 300, # interval of rows, newest row of interval is kept
+                'retention': 90 # days of history kept
             }
         }
     },
@@ -127,7 +156,8 @@ charts = {
                 'format': 'json'
                 },
             'parsed': 'dict',
-            'subdict': 'values'
+            'subdict': 'values',
+            'resync': 1440 # minutes between full downloads, only points after last stored {date} in between
         },
         'file': {
             'path': f'db/market/{currency_pair}/',
@@ -166,7 +196,8 @@ charts = {
                 'sampled': 'true'
                 },
             'parsed': 'dict',
-            'subdict': 'values'
+            'subdict': 'values',
+            'resync': 1440 # minutes between full downloads, only points after last stored {date} in between
         },
         'file': {
             'path': 'db/network/',
@@ -210,6 +241,8 @@ charts = {
     }
 }
 
+# Snapshots are projected at ingest to {subdict} of API response and {fields} of it (all fields if False).
+# Values with prices in different currencies are reduced to {currency_vs} only.
 snapshots = {
     'exchanges': {
         'api': {
@@ -221,7 +254,8 @@ snapshots = {
         'file': {
             'path': f'db/exchanges/',
             'name': 'exchanges.json',
-            'subdict': False
+            'subdict': False,
+            'fields': ['name', 'trade_volume_24h_btc_normalized']
         }
     },
     'fees': {
@@ -234,7 +268,8 @@ snapshots = {
         'file': {
             'path': 'db/fees/',
             'name': 'fees.json',
-            'subdict': False
+            'subdict': False,
+            'fields': False
         }
     },
     'lightning': {
@@ -247,7 +282,8 @@ snapshots = {
         'file': {
             'path': 'db/lightning/',
             'name': 'lightning.json',
-            'subdict': False
+            'subdict': 'latest',
+            'fields': ['added', 'channel_count', 'total_capacity', 'avg_capacity', 'node_count', 'avg_fee_rate', 'avg_base_fee_mtokens']
         }
     },
     'market': {
@@ -266,7 +302,13 @@ snapshots = {
         'file': {
             'path': f'db/market/{currency_pair}/',
             'name': 'market.json',
-            'subdict': 'market_data'
+            'subdict': 'market_data',
+            'fields': [
+                'last_updated', 'current_price', 'price_change_24h_in_currency', 'price_change_percentage_24h_in_currency',
+                'high_24h', 'low_24h', 'market_cap', 'market_cap_change_24h_in_currency',
+                'market_cap_change_percentage_24h_in_currency', 'fully_diluted_valuation', 'ath', 'ath_change_percentage',
+                'ath_date', 'total_volume', 'circulating_supply'
+                ]
         }
     },
     'network': {
@@ -279,7 +321,11 @@ snapshots = {
         'file': {
             'path': 'db/network/',
             'name': 'network.json',
-            'subdict': ''
+            'subdict': '',
+            'fields': [
+                'timestamp', 'market_price_usd', 'hash_rate', 'difficulty', 'nextretarget', 'n_blocks_total',
+                'n_blocks_mined', 'blocks_size', 'minutes_between_blocks', 'n_tx', 'totalbc', 'n_btc_mined', 'total_btc_sent'
+                ]
         }
     },
     'pools': {
@@ -292,22 +338,53 @@ snapshots = {
         'file': {
             'path': 'db/pools/',
             'name': 'pools.json',
-            'subdict': 'pools'
+            'subdict': 'pools',
+            'fields': ['name', 'blockCount']
         }
     }
 }
 
+# Rate limits of API providers by domain. Each provider has bucket of {burst} tokens refilled with
+# {requests} tokens per {period} seconds, shared by all API bases on domain and its subdomains (like
+# api.blockchain.info and blockchain.info). Every call to API (database updates and user requests
+# alike) takes token from bucket or waits for one. Buckets are adjusted at runtime by Retry-After and
+# X-RateLimit headers of API responses. Hosts not listed here use 'default' limits, bucket per host.
+limits = {
+    'coingecko.com': { # public API, 5-15 calls per minute
+        'requests': 10,
+        'period': 60,
+        'burst': 3
+    },
+    'mempool.space': { # no published limits, throttles on abuse
+        'requests': 30,
+        'period': 60,
+        'burst': 5
+    },
+    'blockchain.info': { # 1 call per 10 seconds recommended
+        'requests': 6,
+        'period': 60,
+        'burst': 4
+    },
+    'dune.com': { # free plan, 40 calls per minute
+        'requests': 40,
+        'period': 60,
+        'burst': 5
+    },
+    'default': {
+        'requests': 30,
+        'period': 60,
+        'burst': 5
+    }
+}
+
 delay = 15 # seconds
 
 updates = {
-    # Most of the numbers are primes to minimize chance of requests overlap between diffirent databases with
-    # same API. Charts and snapshots within same database updated with {delay} for the this reason also.
-
     # Databases are updated every {minutes} at :{seconds}, if current time is 13:12:00, {minutes} = 179 and
     # {seconds} = 11, then update will be at 16:11:11, 19:10:11, 22:09:11, 01:08:11, etc.
 
-    # Overal scheme looks like this: {seconds} -> chart -> {delay} -> snapshot -> {delay} -> image -> markdown.
-    # Overal scheme time should not exceed 59 seconds, so {delay} and {seconds} value should be set accordingly.
+    # Overal scheme looks like this: {seconds} -> chart -> {delay} -> snapshot -> image -> markdown.
+    # Updates of databases with same API may overlap, their calls to API are throttled by {limits}.
 
     # API mempool.space:
     'fees': { # snapshot + image
@@ -331,8 +408,8 @@ updates = {
         'minutes': 7,
         'seconds': 2
     },
-    'market_days_90': { # chart
-        'minutes': 13,
+    'market_days_90': { # chart, newest hours are rolled up from 5 minutes chart (see pyramids)
+        'minutes': 119,
         'seconds': 29
     },
     # API Blockchain.com:
@@ -355,6 +432,10 @@ updates = {
     }
 }
 
+# Order of databases warm-up at bot start, most requested first. Until warmed up bot
+# serves images and markdown left in database from previous run:
+warmup = ['market', 'fees', 'network', 'lightning', 'pools', 'exchanges', 'etfs', 'seized', 'market_days_90', 'market_days_max']
+
 
 # Dictionary for creation of images:
 images = {
@@ -642,6 +723,68 @@ images = {
     },
 }
 
+# Settings for render farm of plot images (see render.py):
+farm = {
+    'enabled': True,
+    'workers': 2, # worker processes, each renders one image at a time
+    'timeout': 120, # seconds to wait for rendered image
+    'commands': ['market', 'network', 'lightning', 'etfs', 'seized', 'pools', 'exchanges'] # modules imported by workers at start
+}
+
+# Downsampling of long plot lines. Plots are 12 inches wide at 150 dpi, so lines longer than
+# {points} are reduced to {points} by Largest-Triangle-Three-Buckets keeping shape and extremes:
+downsample = {
+    'enabled': True,
+    'points': 1800
+}
+
+# Pyramids of charts of different resolution (see store.py). Levels are listed from finest
+# to coarsest, each level has rows of its chart and, with {rollup}, newest rows of finer level
+# rolled up to {seconds} interval. Only levels of same API provider are rolled up, as their
+# metrics match. Period is served from finest level which covers it with at most
+# {points} rows and without gaps over {gap} intervals, so periods within accumulated 5
+# minutes history are served from it:
+pyramids = {
+    'market': {
+        'path': f'db/market/{currency_pair}/market.pyramid/',
+        'columns': ['price', 'total_volume'],
+        'points': 26000,
+        'gap': 3, # intervals between rows of level, longer steps are history missed while bot was down
+        'levels': [
+            {'chart': 'market', 'seconds': 300, 'rollup': False},
+            {'chart': 'market_days_90', 'seconds': 3600, 'rollup': True}, # CoinGecko, same as 5 minutes level
+            {'chart': 'market_days_max', 'seconds': 86400, 'rollup': False} # blockchain.com trade volume isn't CoinGecko total volume
+        ]
+    }
+}
+
+# Dictionary for render cache of images and markdown. Rendered files are cached by command,
+# period of days and versions of {renders} databases, so cache entry is invalidated by any
+# change of databases used by command:
+cache = {
+    'path': 'db/cache/',
+    'memory': 64 * 1024**2, # bytes of rendered files kept in memory
+    'disk': 512 * 1024**2 # bytes of rendered files kept in {path}
+}
+
+# Periods of days rendered in background after each update of databases used by command, so
+# requests from history keyboard are served from cache. Most requested periods of each command
+# are learned from requests counted in {requests} and rendered too:
+precompute = {
+    'periods': [7, 30, 90, 365, 'max'],
+    'learned': 3, # most requested periods added to {periods}, 0 to disable
+    'requests': 'db/cache/requests.json',
+    'delay': 30 # seconds to wait for other databases of command to update before render
+}
+
+renders = {
+    'etfs': ['etfs', 'network'],
+    'lightning': ['lightning'],
+    'market': ['market', 'market_days_90', 'market_days_max'],
+    'network': ['network'],
+    'seized': ['seized', 'network']
+}
+
 # Dictionary with default period of days for plots:
 days = {
     'etfs': 90,
@@ -0,0 +1,120 @@
+import time
+import functools
+import importlib
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+from logger import main_logger
+from tools import error_handler_common
+
+
+'''
+Functions for render farm of plot images. Draw functions decorated with farm_render
+are run in pool of long-lived worker processes, so concurrent renders are spread over
+CPU cores instead of sharing GIL of bot process. Workers import plot libraries and
+command modules and load fonts and decode backgrounds once at start. Worker saves rendered
+image to its path and returns only the path to bot process. If farm is disabled, broken
+or timed out, render is made in calling thread.
+'''
+
+
+# Draw functions registered by farm_render, pool of workers and flag set in worker processes:
+render_functions = {}
+render_executor = None
+render_lock = threading.Lock()
+render_worker = False
+
+
+@error_handler_common
+def get_render_assets():
+    # Returns paths of fonts and backgrounds from images configuration.
+    render_assets = set()
+    def collect_paths(item):
+        if isinstance(item, dict):
+            for key, value in item.items():
+                if key in ('font', 'path') and isinstance(value, str) and value.startswith('src/'):
+                    render_assets.add(value)
+                else:
+                    collect_paths(value)
+    collect_paths(config.images)
+    return sorted(render_assets)
+
+def warm_render_worker():
+    # Initializer of worker process. Imports plot libraries and command modules, loads
+    # fonts to matplotlib and PIL caches and decodes background images once.
+    global render_worker
+    render_worker = True
+    warm_start = time.perf_counter()
+
+    import pandas
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import font_manager
+    from assets import load_background, load_font_file
+
+    for command in config.farm['commands']:
+        importlib.import_module(f'cmds.{command}')
+    for asset in get_render_assets() or []:
+        if asset.endswith('.ttf'):
+            font_manager.FontProperties(fname=asset).get_name()
+            load_font_file(asset)
+        elif asset.endswith('.png'):
+            load_background(asset)
+    main_logger.debug(f'render worker warmed up in {round(time.perf_counter() - warm_start, 2)} seconds')
+
+@error_handler_common
+def get_render_executor():
+    # Returns pool of render workers, started on first use. Workers are spawned, not
+    # forked, so they don't inherit locks held by threads of bot process.
+    global render_executor
+    with render_lock:
+        if render_executor is None:
+            render_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=config.farm['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=warm_render_worker)
+            main_logger.info(f"render farm started with {config.farm['workers']} workers")
+        return render_executor
+
+@error_handler_common
+def reset_render_executor():
+    # Drops broken pool of render workers, new pool is started on next render.
+    global render_executor
+    with render_lock:
+        if render_executor is not None:
+            render_executor.shutdown(wait=False, cancel_futures=True)
+            render_executor = None
+
+def run_render_job(name, args, kwargs):
+    # Runs registered draw function in worker process. Returns path of saved image.
+    importlib.import_module(f"cmds.{name.split('.')[0]}") # Registers draw functions of command
+    return render_functions[name](*args, **kwargs)
+
+def farm_render(command):
+    # Decorator for draw_* functions of command. In bot process call is sent to render
+    # farm and path of image saved by worker is returned. In worker process and with
+    # farm disabled draw function runs in calling thread.
+    def decorator(render_function):
+        render_name = f'{command}.{render_function.__name__}'
+        render_functions[render_name] = render_function
+
+        @functools.wraps(render_function)
+        def wrapper(*args, **kwargs):
+            if render_worker or not config.farm['enabled']:
+                return render_function(*args, **kwargs)
+            try:
+                render_job = get_render_executor().submit(run_render_job, render_name, args, kwargs)
+                render_file = render_job.result(timeout=config.farm['timeout'])
+            except BrokenProcessPool:
+                main_logger.warning(f'render farm broken, {render_name} rendered locally')
+                reset_render_executor()
+                return render_function(*args, **kwargs)
+            except concurrent.futures.TimeoutError:
+                main_logger.warning(f'{render_name} timed out in render farm, rendered locally')
+                return render_function(*args, **kwargs)
+            return render_file
+        return wrapper
+    return decorator
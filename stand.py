@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import config
+from logger import main_logger
+from tools import (error_handler_common,
+                   get_stand_fixture_names,
+                   ingest_databases,
+                   api_latency)
+
+
+'''
+Local stand for API providers. In 'record' mode databases are ingested from live API
+and responses are saved to fixtures. In 'replay' mode calls to API are redirected to
+local HTTP server which replays fixtures with latency, failures and rate limiting set
+in config.stand. Usage: python3 stand.py record|replay|serve
+'''
+
+
+# Responses of stand per API provider in current second for rate limiting:
+stand_rate = {}
+stand_lock = threading.Lock()
+
+
+class StandHandler(BaseHTTPRequestHandler):
+    # Replays fixture for requested URL. First path segment is API provider domain.
+
+    def do_GET(self):
+        stand = config.stand
+        stand_provider = self.path.lstrip('/').split('/')[0]
+        time.sleep(random.uniform(*stand['latency']))
+
+        if stand['rate']:
+            with stand_lock:
+                second = int(time.time())
+                calls = stand_rate.get(stand_provider, (second, 0))
+                calls = (second, calls[1] + 1) if calls[0] == second else (second, 1)
+                stand_rate[stand_provider] = calls
+            if calls[1] > stand['rate']:
+                return self.send_stand_response(429, {'Retry-After': '1'})
+        if random.random() < stand['failures']:
+            return self.send_stand_response(503)
+
+        for fixture_name in get_stand_fixture_names(f"http://{stand['host']}:{stand['port']}{self.path}"):
+            fixture_file = stand['fixtures'] + fixture_name
+            if os.path.isfile(fixture_file + '.json') and os.path.isfile(fixture_file + '.body'):
+                with open(fixture_file + '.json', 'r') as json_file:
+                    fixture_metadata = json.load(json_file)
+                fixture_headers = fixture_metadata['headers']
+                if fixture_headers.get('ETag') and self.headers.get('If-None-Match') == fixture_headers['ETag']:
+                    return self.send_stand_response(304, fixture_headers)
+                with open(fixture_file + '.body', 'rb') as body_file:
+                    return self.send_stand_response(fixture_metadata['status'], fixture_headers, body_file.read())
+        return self.send_stand_response(404)
+
+    def send_stand_response(self, status, headers={}, body=b''):
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        main_logger.debug(f'stand {self.address_string()} {format % args}')
+
+@error_handler_common
+def start_stand():
+    # Starts stand server in background thread and returns it.
+    stand_server = ThreadingHTTPServer((config.stand['host'], config.stand['port']), StandHandler)
+    threading.Thread(target=stand_server.serve_forever, name='stand', daemon=True).start()
+    main_logger.info(f"stand serving {config.stand['fixtures']} at {config.stand['host']}:{config.stand['port']}")
+    return stand_server
+
+@error_handler_common
+def use_stand_databases():
+    # Moves databases of charts, snapshots and pyramids to {databases} of stand, so
+    # replayed data doesn't change live databases (like accumulated market history).
+    for database in list(config.charts.values()) + list(config.snapshots.values()):
+        database['file']['path'] = database['file']['path'].replace('db/', config.stand['databases'], 1)
+    for pyramid in config.pyramids.values():
+        pyramid['path'] = pyramid['path'].replace('db/', config.stand['databases'], 1)
+
+@error_handler_common
+def run_ingest_benchmark(mode):
+    # Ingests all databases in given mode and reports overall time and API latency per provider.
+    config.stand['mode'] = mode
+    stand_server = None
+    if mode == 'replay':
+        use_stand_databases()
+        stand_server = start_stand()
+
+    benchmark_start = time.perf_counter()
+    ingest_databases()
+    benchmark_seconds = time.perf_counter() - benchmark_start
+
+    main_logger.info(f'ingest in {mode} mode took {round(benchmark_seconds, 2)} seconds')
+    for provider, latency in sorted(api_latency.items()):
+        latency_mean = latency['seconds'] / latency['calls'] if latency['calls'] else 0
+        main_logger.info(f"{provider}: {latency['calls']} calls, {latency['errors']} errors, "
+                         f"mean {round(latency_mean * 1000)} ms, max {round(latency['max'] * 1000)} ms")
+    if stand_server:
+        stand_server.shutdown()
+
+
+if __name__ == '__main__':
+    stand_mode = sys.argv[1] if len(sys.argv) > 1 else 'replay'
+    if stand_mode == 'serve':
+        start_stand()
+        threading.Event().wait()
+    else:
+        run_ingest_benchmark(stand_mode)
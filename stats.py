@@ -0,0 +1,144 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from tools import error_handler_common, get_database_version
+
+
+'''
+Functions for statistics of chart columns used by draw_* and write_* functions.
+
+Rolling means are calculated from prefix sums of chart column, kept per chart file and
+key of series with version of chart file. Key is given by caller and names series as
+derived from chart (column, or column of reordered or grouped chart), so derived series
+of same length never share kept sums. When ingest appends rows or replaces tail of chart,
+prefix sums are extended from first changed row, so rolling mean of any period takes
+time proportional to period, not to whole history of chart.
+
+Highs and lows of periods are queried from sparse tables of chart column, kept and
+updated same way. Table level k keeps indexes of min and max of every 2^k rows, so min,
+max and their indexes for any period are taken from two overlapping entries.
+'''
+
+
+# Prefix sums (and counts of non-NaN values) of chart columns and lock for them:
+rolling_sums = {}
+rolling_lock = threading.Lock()
+
+# Sparse tables of indexes of min and max values of chart columns and lock for them:
+range_tables = {}
+range_lock = threading.Lock()
+
+
+@error_handler_common
+def find_changed_row(kept_values, values):
+    # Returns index of first row of values changed since kept values. Rows appended to
+    # kept values are changed rows too.
+    overlap = min(len(kept_values), len(values))
+    kept_values, new_values = kept_values[:overlap], values[:overlap]
+    changed = np.flatnonzero((kept_values != new_values) & ~(np.isnan(kept_values) & np.isnan(new_values)))
+    return int(changed[0]) if len(changed) else overlap
+
+@error_handler_common
+def update_rolling_sums(file, key, values):
+    # Returns prefix sums of column values. Sums kept for same version of file are reused,
+    # for new version sums are recalculated from first row changed since kept version.
+    version = get_database_version(file)
+    with rolling_lock:
+        kept = rolling_sums.get((file, key))
+    if kept and kept['version'] == version and len(kept['values']) == len(values):
+        return kept
+
+    start = find_changed_row(kept['values'], values) if kept else 0
+
+    sums = np.zeros(len(values) + 1)
+    counts = np.zeros(len(values) + 1, dtype=np.int64)
+    if start:
+        sums[:start + 1] = kept['sums'][:start + 1]
+        counts[:start + 1] = kept['counts'][:start + 1]
+    valid = ~np.isnan(values[start:])
+    sums[start + 1:] = sums[start] + np.cumsum(np.where(valid, values[start:], 0.0))
+    counts[start + 1:] = counts[start] + np.cumsum(valid)
+
+    kept = {'version': version, 'values': values, 'sums': sums, 'counts': counts}
+    with rolling_lock:
+        rolling_sums[(file, key)] = kept
+    return kept
+
+@error_handler_common
+def get_rolling_mean(file, key, series, window, first, last):
+    # Returns rows [first, last) of rolling mean of series derived from chart, same as
+    # series.rolling(window).mean()[first:last]. Mean of window with NaN values is NaN.
+    values = series.to_numpy(dtype=float)
+    kept = update_rolling_sums(file, key, values)
+    last = min(last, len(values))
+    ends = np.arange(first, last) + 1
+    starts = np.maximum(ends - window, 0)
+    window_sums = kept['sums'][ends] - kept['sums'][starts]
+    window_counts = kept['counts'][ends] - kept['counts'][starts]
+    means = np.where((ends >= window) & (window_counts == window), window_sums / window, np.nan)
+    return pd.Series(means, index=series.index[first:last], name=series.name)
+
+@error_handler_common
+def choose_range_indexes(values, left, right, highest):
+    # Returns index of higher (or lower) value of each pair of left and right indexes.
+    # Left index is kept for equal values, so first of equal values is chosen.
+    if highest:
+        return np.where(values[left] >= values[right], left, right)
+    return np.where(values[left] <= values[right], left, right)
+
+@error_handler_common
+def update_range_tables(file, key, values):
+    # Returns sparse tables of column values. Tables kept for same version of file are
+    # reused, for new version only entries covering rows changed since kept version are
+    # calculated again. NaN values are never chosen as min or max.
+    version = get_database_version(file)
+    with range_lock:
+        kept = range_tables.get((file, key))
+    if kept and kept['version'] == version and len(kept['values']) == len(values):
+        return kept
+
+    start = find_changed_row(kept['values'], values) if kept else 0
+    tables, compared_values = {}, {}
+    for highest, fill in [(True, -np.inf), (False, np.inf)]:
+        compared = np.where(np.isnan(values), fill, values)
+        compared_values[highest] = compared
+        levels = [np.arange(len(values))]
+        span = 2
+        while span <= len(values):
+            previous = levels[-1]
+            count = len(values) - span + 1
+            level = np.empty(count, dtype=np.int64)
+            reused = max(min(start - span + 1, count), 0) if kept else 0
+            if reused:
+                level[:reused] = kept['tables'][highest][len(levels)][:reused]
+            rows = np.arange(reused, count)
+            level[reused:] = choose_range_indexes(compared, previous[rows], previous[rows + span // 2], highest)
+            levels.append(level)
+            span *= 2
+        tables[highest] = levels
+
+    kept = {'version': version, 'values': values, 'compared': compared_values, 'tables': tables}
+    with range_lock:
+        range_tables[(file, key)] = kept
+    return kept
+
+@error_handler_common
+def get_range_stats(file, key, series, first, last):
+    # Returns first, last, min and max values of rows [first, last) of series derived
+    # from chart and index labels of min and max (same as idxmin and idxmax of period
+    # slice). Series is named by key, see get_rolling_mean.
+    values = series.to_numpy(dtype=float)
+    last = min(last, len(values))
+    if first < 0 or last <= first:
+        raise ValueError(f'empty range [{first}, {last}) of {key} in {file}')
+    kept = update_range_tables(file, key, values)
+    level = (last - first).bit_length() - 1
+    span = 1 << level
+    range_stats = {'first': values[first], 'last': values[last - 1]}
+    for highest, name in [(True, 'max'), (False, 'min')]:
+        entries = kept['tables'][highest][level]
+        index = choose_range_indexes(kept['compared'][highest], entries[[first]], entries[[last - span]], highest)[0]
+        range_stats[name] = values[index]
+        range_stats[f'idx{name}'] = series.index[index]
+    return range_stats
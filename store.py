@@ -0,0 +1,299 @@
+import os
+import math
+import fcntl
+import json
+import hashlib
+import functools
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from types import MappingProxyType
+
+import config
+from tools import (error_handler_common,
+                   get_database_version,
+                   project_saved_snapshot_data,
+                   subscribe_database_versions,
+                   write_database_file)
+
+
+'''
+Store of snapshots shared by draw_* and write_* functions. Snapshot file is parsed once
+per version of file and every render gets same parsed data instead of opening and
+parsing JSON file again. Parsed data is read-only (dicts are mapping proxies and lists
+are tuples), so render can't change data seen by other renders. Entry is dropped when
+ingest publishes new version of snapshot.
+
+Charts are stored in columnar format next to chart CSV, which is kept as export and
+source of chart version: {chart}.columns/{version}/ with one .npy file per column and
+schema.json of version written last. CSV is parsed once per version (after ingest or on
+first load), renders get DataFrame of read-only columns memory-mapped from .npy files.
+Bot process and render workers save versions under file lock, only version which is
+still current is saved, and previous version is kept for processes still loading it.
+
+Market data of different resolutions (5 minutes, 1 hour and 1 day charts) is kept as
+pyramid of levels, one level per chart. Newest rows of finer level are rolled up to
+coarser levels of same API provider, and get_series serves any period from finest level
+covering it with limited number of rows, so draw_* and write_* functions don't choose
+charts themselves.
+'''
+
+
+# Parsed snapshots (database -> version and data) and lock for them:
+snapshot_store = {}
+store_lock = threading.Lock()
+
+# Memory-mapped columns (column files path -> version and arrays) and lock for them:
+chart_columns = {}
+chart_lock = threading.Lock()
+
+
+@error_handler_common
+def freeze_snapshot_data(data):
+    # Returns read-only copy of parsed JSON data.
+    if isinstance(data, dict):
+        return MappingProxyType({key: freeze_snapshot_data(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze_snapshot_data(value) for value in data)
+    return data
+
+@error_handler_common
+def get_snapshot(database):
+    # Returns read-only data of snapshot database. File is parsed only if its version
+    # changed since last call. File saved before ingest projection is projected on read.
+    snapshot = config.snapshots[database]
+    snapshot_file = snapshot['file']['path'] + snapshot['file']['name']
+    snapshot_version = get_database_version(snapshot_file)
+    with store_lock:
+        stored = snapshot_store.get(database)
+    if stored and stored['version'] == snapshot_version:
+        return stored['data']
+
+    with open(snapshot_file, 'r') as json_file:
+        snapshot_data = json.load(json_file)
+    snapshot_data = project_saved_snapshot_data(snapshot_data, snapshot['file']['subdict'], snapshot['file']['fields'])
+    snapshot_data = freeze_snapshot_data(snapshot_data)
+    with store_lock:
+        snapshot_store[database] = {'version': snapshot_version, 'data': snapshot_data}
+    return snapshot_data
+
+@error_handler_common
+def invalidate_snapshot(database, file, version):
+    # Drops parsed snapshot of previous version.
+    with store_lock:
+        stored = snapshot_store.get(database)
+        if stored and stored['version'] != version:
+            del snapshot_store[database]
+
+@error_handler_common
+def get_chart_columns_path(file):
+    # Returns directory of column files of chart CSV file.
+    return os.path.splitext(file)[0] + '.columns/'
+
+@error_handler_common
+def read_columns_schema(columns_path):
+    # Returns schema of column files (of version, if version path is given) or None if
+    # data was not saved yet.
+    schema_file = columns_path + 'schema.json'
+    if not os.path.isfile(schema_file):
+        return None
+    with open(schema_file, 'r') as json_file:
+        return json.load(json_file)
+
+@error_handler_common
+def save_column_file(file, values):
+    # Saves array to .npy file through temporary file.
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(file), prefix='.', suffix='.tmp', delete=False) as column_file:
+        np.save(column_file, values)
+    os.replace(column_file.name, file)
+
+@error_handler_common
+def load_column_file(version_path, column):
+    # Returns memory-mapped column. Text column with missing values is returned as copy
+    # with NaN in null rows, same as column parsed from CSV.
+    values = np.load(version_path + column['file'], mmap_mode='r')
+    if not column.get('mask'):
+        return values
+    values = values.astype(object)
+    values[np.load(version_path + column['mask'])] = np.nan
+    return values
+
+@error_handler_common
+def write_columns(columns_path, version, data):
+    # Saves DataFrame to column files of version and switches schema to them. Text
+    # columns are saved as fixed width strings, so all columns can be memory-mapped, and
+    # missing values of text columns are saved as mask of null rows. Schema of version
+    # is written last, so only complete versions are loaded. Column files of versions
+    # older than previous one are removed.
+    version_path = columns_path + f'{version}/'
+    os.makedirs(version_path, exist_ok=True)
+
+    schema = {'version': version, 'rows': len(data), 'columns': []}
+    for index, column in enumerate(data.columns):
+        values = data[column].to_numpy()
+        column_schema = {'name': column, 'file': f'{index}.npy', 'mask': None}
+        if values.dtype == object:
+            nulls = pd.isna(values)
+            if nulls.any():
+                save_column_file(version_path + f'{index}.mask.npy', nulls)
+                column_schema['mask'] = f'{index}.mask.npy'
+            values = np.where(nulls, '', values).astype(str)
+        save_column_file(version_path + column_schema['file'], values)
+        schema['columns'].append(dict(column_schema, dtype=values.dtype.str))
+    write_database_file(version_path + 'schema.json', json.dumps(schema))
+
+    previous = read_columns_schema(columns_path)
+    write_database_file(columns_path + 'schema.json', json.dumps(schema))
+    kept_versions = [version, previous['version'] if previous else None]
+    for entry in os.listdir(columns_path):
+        if entry not in kept_versions and os.path.isdir(columns_path + entry):
+            shutil.rmtree(columns_path + entry, ignore_errors=True)
+    return schema
+
+@error_handler_common
+def load_columns(columns_path, get_version, make_data):
+    # Returns DataFrame of read-only columns memory-mapped from column files of current
+    # version, without copy. If column files of version don't exist, they are saved from
+    # DataFrame returned by make_data under file lock shared with other threads and
+    # processes. If version changed while data was made, data is returned without saving,
+    # as it may be newer than version. chart_lock is only held to read and switch loaded
+    # columns, so renders of other charts don't wait for data to be made.
+    version = get_version()
+    version_path = columns_path + f'{version}/'
+    with chart_lock:
+        loaded = chart_columns.get(columns_path)
+    if loaded and loaded['version'] == version:
+        return pd.DataFrame(loaded['arrays'], copy=False)
+
+    schema = read_columns_schema(version_path)
+    if not schema:
+        os.makedirs(columns_path, exist_ok=True)
+        with open(columns_path + 'lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            schema = read_columns_schema(version_path)
+            if not schema:
+                data = make_data()
+                if get_version() != version:
+                    return data
+                schema = write_columns(columns_path, version, data)
+    arrays = {column['name']: load_column_file(version_path, column) for column in schema['columns']}
+    with chart_lock:
+        chart_columns[columns_path] = {'version': version, 'arrays': arrays}
+    return pd.DataFrame(arrays, copy=False)
+
+@error_handler_common
+def load_chart(database):
+    # Returns chart database as DataFrame of memory-mapped columns. Column files are made
+    # from chart CSV if its version changed.
+    chart = config.charts[database]
+    chart_file = chart['file']['path'] + chart['file']['name']
+    return load_columns(get_chart_columns_path(chart_file), functools.partial(get_database_version, chart_file), functools.partial(pd.read_csv, chart_file))
+
+@error_handler_common
+def update_chart_columns(database, file, version):
+    # Converts chart to column files right after ingest, so renders of new version don't
+    # parse CSV.
+    if database in config.charts and version:
+        load_chart(database)
+
+@error_handler_common
+def get_pyramid_version(database):
+    # Returns version of pyramid made of its configuration and versions of charts of its
+    # levels, so levels are built again after change of either.
+    chart_versions = {'levels': config.pyramids[database]['levels']}
+    for level in config.pyramids[database]['levels']:
+        chart = config.charts[level['chart']]
+        chart_versions[level['chart']] = get_database_version(chart['file']['path'] + chart['file']['name'])
+    return hashlib.sha256(json.dumps(chart_versions, sort_keys=True).encode()).hexdigest()[:16]
+
+@error_handler_common
+def build_pyramid_levels(database):
+    # Returns DataFrames of pyramid levels from finest to coarsest. Level has rows of its
+    # chart and, if level has {rollup}, rows of finer level after last row of chart rolled
+    # up to level interval (mean of each interval), so newest data of finer charts of same
+    # API provider reaches coarser levels. Charts of other providers have different
+    # metrics (like total volume), so they are never mixed. Dates of all levels are
+    # timestamps in seconds.
+    pyramid = config.pyramids[database]
+    columns = ['date'] + pyramid['columns']
+    levels, finer_data = [], None
+    for level in pyramid['levels']:
+        chart = config.charts[level['chart']]
+        if os.path.isfile(chart['file']['path'] + chart['file']['name']):
+            level_data = load_chart(level['chart'])[columns].astype({'date': np.int64})
+        else:
+            level_data = pd.DataFrame({column: pd.Series(dtype=np.int64 if column == 'date' else float) for column in columns})
+        level_data['date'] = np.where(level_data['date'] > 9999999999, level_data['date'] // 1000, level_data['date'])
+
+        if level['rollup'] and finer_data is not None and len(finer_data):
+            last_date = level_data['date'].iloc[-1] if len(level_data) else -1
+            finer_intervals = finer_data['date'] // level['seconds'] * level['seconds']
+            finer_newer = finer_intervals > last_date
+            rolled_data = finer_data[finer_newer].drop(columns='date').groupby(finer_intervals[finer_newer]).mean()
+            level_data = pd.concat([level_data, rolled_data.rename_axis('date').reset_index()], ignore_index=True)
+
+        levels.append(level_data)
+        finer_data = level_data
+    return levels
+
+@error_handler_common
+def load_pyramid(database):
+    # Returns levels of pyramid (interval, chart, file and data) for current versions of
+    # level charts. Levels are saved to column files, so they are built again only after
+    # any level chart changed. Schema file of level is used as its file for statistics.
+    pyramid = config.pyramids[database]
+    built = {}
+    def make_level(index):
+        if 'levels' not in built:
+            built['levels'] = build_pyramid_levels(database)
+        return built['levels'][index]
+
+    levels = []
+    for index, level in enumerate(pyramid['levels']):
+        level_path = pyramid['path'] + f"{level['seconds']}.columns/"
+        level_data = load_columns(level_path, functools.partial(get_pyramid_version, database), functools.partial(make_level, index))
+        levels.append({'seconds': level['seconds'], 'chart': level['chart'], 'file': level_path + 'schema.json', 'data': level_data})
+    return levels
+
+@error_handler_common
+def get_series_span(database):
+    # Returns first and last dates (timestamps in seconds) of data kept by pyramid.
+    levels = [level['data']['date'] for level in load_pyramid(database) if len(level['data'])]
+    return min(dates.iloc[0] for dates in levels), max(dates.iloc[-1] for dates in levels)
+
+@error_handler_common
+def get_series(database, start, end, max_points=None, lookback=0):
+    # Returns period [start, end] (timestamps in seconds) from finest pyramid level which
+    # covers start of period with at most {max_points} rows. Level must also have window
+    # of {lookback} share of period rows before period (rows used by rolling means) and
+    # no step between rows over {gap} intervals (history missed while bot was down). If
+    # no level covers it, coarsest level is used. Level data is returned whole with
+    # indexes of first and after last rows of period and size of window.
+    pyramid = config.pyramids[database]
+    max_points = max_points or pyramid['points']
+    series = None
+    for level in load_pyramid(database):
+        dates = level['data']['date'].to_numpy()
+        if not len(dates):
+            continue
+        first, last = np.searchsorted(dates, start, side='left'), np.searchsorted(dates, end, side='right')
+        window = math.ceil((last - first) * lookback)
+        series = dict(level, first=int(first), last=int(last), window=window)
+        if dates[0] <= start + level['seconds'] and first >= window and last - first <= max_points:
+            steps = np.diff(dates[first - window:last])
+            if not len(steps) or steps.max() <= pyramid['gap'] * level['seconds']:
+                break
+    return series
+
+@error_handler_common
+def update_pyramid(database, file, version):
+    # Builds pyramids of chart right after ingest.
+    for pyramid_name, pyramid in config.pyramids.items():
+        if database in [level['chart'] for level in pyramid['levels']]:
+            load_pyramid(pyramid_name)
+
+subscribe_database_versions(invalidate_snapshot)
+subscribe_database_versions(update_chart_columns)
+subscribe_database_versions(update_pyramid)
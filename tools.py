@@ -1,15 +1,29 @@
 import os
 import json
+import math
 import time
+import random
+import hashlib
+import tempfile
 import asyncio
+import threading
 import traceback
 import requests
 import schedule
 import importlib
 import functools
+import contextlib
+import concurrent.futures
+import numpy as np
 import pandas as pd
 
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
 from currency_symbols import CurrencySymbols
 from memory_profiler import profile
 
@@ -48,22 +62,369 @@ Functions for managing database:
 - clean database from user-generated files
 '''
 
+# Shared sessions and latency records for API providers (provider is API base domain)
+# and rate limit buckets for each provider domain in limits (see get_api_provider):
+api_sessions = {}
+api_latency = {}
+api_buckets = {}
+api_lock = threading.Lock()
+
+# Time of last full download for charts updated incrementally and dates dropped
+# from charts on last update because some of endpoints had no value for them:
+chart_resyncs = {}
+chart_dropped_dates = {}
+
+# Validators (ETag, Last-Modified) of last snapshot responses, versions of database
+# files (content hash revalidated by file stat) and callbacks for version changes:
+snapshot_validators = {}
+database_versions = {}
+database_published = {}
+database_listeners = []
+database_lock = threading.Lock()
+
+# States of databases since bot start: 'missing' (no files), 'stale' (files of previous
+# run), 'warming' (update in progress), 'ready' (updated in this run) or 'failed' (last
+# update failed), and failed updates (make function and database):
+database_status = {}
+database_failures = set()
+
+@error_handler_common
+def get_api_session(base):
+    # Returns session shared by all calls to API provider. Session keeps TCP and TLS
+    # connections alive in pool, so handshake is made once instead of every call.
+    api_provider = urlparse(base).netloc
+    with api_lock:
+        if api_provider not in api_sessions:
+            api_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.connections['pool'])
+            api_session = requests.Session()
+            api_session.mount('https://', api_adapter)
+            api_session.mount('http://', api_adapter)
+            api_sessions[api_provider] = api_session
+        return api_sessions[api_provider]
+
+@error_handler_common
+def record_api_latency(base, seconds, status):
+    # Records latency of API call to provider statistics. Failed calls counted as errors.
+    api_provider = urlparse(base).netloc
+    with api_lock:
+        latency = api_latency.setdefault(api_provider, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'last': 0.0, 'max': 0.0})
+        latency['calls'] += 1
+        latency['errors'] += 1 if status is None or status >= 400 else 0
+        latency['seconds'] += seconds
+        latency['last'] = seconds
+        latency['max'] = max(latency['max'], seconds)
+    main_logger.debug(f'{api_provider} responded {status} in {round(seconds * 1000)} ms')
+
+def get_api_provider(base):
+    # Returns domain in limits which host of API base is or is subdomain of. Host not
+    # listed in limits is returned as is.
+    api_host = urlparse(base).netloc
+    for provider in config.limits:
+        if api_host == provider or api_host.endswith(f'.{provider}'):
+            return provider
+    return api_host
+
+def get_api_bucket(base):
+    # Returns rate limit bucket of API provider of base refilled to current time. Must be
+    # called with api_lock.
+    api_provider = get_api_provider(base)
+    if api_provider not in api_buckets:
+        limit = config.limits.get(api_provider, config.limits['default'])
+        api_buckets[api_provider] = {
+            'tokens': limit['burst'],
+            'capacity': limit['burst'],
+            'rate': limit['requests'] / limit['period'],
+            'updated': time.monotonic(),
+            'blocked': 0.0
+        }
+    bucket = api_buckets[api_provider]
+    now = time.monotonic()
+    bucket['tokens'] = min(bucket['capacity'], bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+    bucket['updated'] = now
+    return bucket
+
+@error_handler_common
+def acquire_api_token(base):
+    # Takes token from bucket of provider of API base. If bucket is empty or blocked by
+    # API response headers, waits until token is available.
+    while True:
+        with api_lock:
+            bucket = get_api_bucket(base)
+            now = time.monotonic()
+            if now >= bucket['blocked'] and bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                return
+            token_wait = max(bucket['blocked'] - now, (1 - bucket['tokens']) / bucket['rate'])
+        time.sleep(token_wait)
+
+@error_handler_common
+def convert_limit_header_to_seconds(value):
+    # Converts Retry-After or X-RateLimit-Reset header value to seconds from now.
+    # Value can be seconds, unix timestamp or HTTP date.
+    try:
+        seconds = float(value)
+        return seconds - time.time() if seconds > 1_000_000_000 else seconds
+    except ValueError:
+        return (parsedate_to_datetime(value) - datetime.now(parsedate_to_datetime(value).tzinfo)).total_seconds()
+
 @error_handler_common
-def get_api_data(base, endpoint, params=False):
-# Builds formatted URL to API based on user configuration and retrieves API data.
+def adjust_api_bucket(base, response):
+    # Adjusts bucket of provider of API base to rate limit headers of API response. Bucket
+    # blocked for Retry-After seconds or till X-RateLimit-Reset if no calls remaining.
+    headers = response.headers
+    limit_remaining = headers.get('X-RateLimit-Remaining')
+    limit_reset = headers.get('X-RateLimit-Reset')
+    limit_retry_after = headers.get('Retry-After')
+
+    block_seconds = 0
+    if limit_retry_after:
+        block_seconds = convert_limit_header_to_seconds(limit_retry_after) or 0
+    elif limit_remaining is not None and limit_remaining.isdigit() and int(limit_remaining) == 0 and limit_reset:
+        block_seconds = convert_limit_header_to_seconds(limit_reset) or 0
+
+    with api_lock:
+        bucket = get_api_bucket(base)
+        if limit_remaining is not None and limit_remaining.isdigit():
+            bucket['tokens'] = min(bucket['tokens'], int(limit_remaining))
+        if block_seconds > 0:
+            bucket['tokens'] = 0
+            bucket['blocked'] = max(bucket['blocked'], time.monotonic() + block_seconds)
+    if block_seconds > 0:
+        main_logger.warning(f'{base} rate limited for {round(block_seconds)} seconds')
+
+@error_handler_common
+def get_api_data(base, endpoint, params=False, stream=False, headers=False):
+    # Builds formatted URL to API based on user configuration and retrieves API data.
+    # Each call waits for token of API base rate limit. Calls to API with 429/5xx response
+    # or failed connection are repeated with exponential backoff and random jitter up to
+    # number of retries in user configuration. With {stream} response body is not loaded
+    # until read by caller. {headers} are added to request (e.g. for conditional requests).
+    connections = config.connections
     query_params = []
     if params: # Build queries list from standart API parameters and custom database parameters
         for query, value in params.items():
             params[f'{query}']=f'{value}'
             query_params.append(f"{query}={value}")
     api_url = f"{base}{endpoint}?{'&'.join(query_params)}"
-    api_response = requests.get(api_url)
+    api_session = get_api_session(base)
+
+    # Calls to API redirected to local stand in replay mode:
+    stand = config.stand
+    if stand['mode'] == 'replay':
+        api_url = f"http://{stand['host']}:{stand['port']}/{urlparse(base).netloc}{urlparse(api_url).path}?{'&'.join(query_params)}"
+
+    api_throttled = stand['mode'] != 'replay' or stand['throttle'] # Calls to stand bypass bucket unless {throttle}
+    for api_attempt in range(connections['retries'] + 1):
+        if api_throttled:
+            acquire_api_token(base)
+        api_call_start = time.perf_counter()
+        try:
+            api_response = api_session.get(api_url, timeout=connections['timeout'], stream=stream, headers=headers or None)
+        except (requests.ConnectionError, requests.Timeout) as api_error:
+            record_api_latency(base, time.perf_counter() - api_call_start, None)
+            if api_attempt == connections['retries']:
+                raise
+            api_status = type(api_error).__name__
+        else:
+            record_api_latency(base, time.perf_counter() - api_call_start, api_response.status_code)
+            adjust_api_bucket(base, api_response)
+            if api_response.status_code not in connections['statuses'] or api_attempt == connections['retries']:
+                break
+            api_response.close() # Release connection of unread streamed response back to pool
+            if 'Retry-After' in api_response.headers:
+                if not api_throttled: # Bucket is bypassed, so wait for Retry-After here
+                    time.sleep(max(convert_limit_header_to_seconds(api_response.headers['Retry-After']) or 0, 0))
+                continue # Bucket is blocked for Retry-After seconds, no additional backoff needed
+            api_status = api_response.status_code
+        api_backoff = connections['backoff'] * 2 ** api_attempt + random.uniform(0, connections['jitter'])
+        main_logger.warning(f'{base}{endpoint} returned {api_status}, retry in {round(api_backoff, 1)} seconds')
+        time.sleep(api_backoff)
+
+    if stand['mode'] == 'record':
+        record_stand_fixture(api_url, api_response)
     return api_response
 
+@error_handler_common
+def get_stand_fixture_names(url):
+    # Returns names of stand fixture for URL: exact (with query) and fallback (path only).
+    # Query values of 'api_key' are excluded, so tokens never get to fixtures.
+    url = urlparse(url)
+    url_query = '&'.join(sorted(query for query in url.query.split('&') if query and not query.startswith('api_key=')))
+    url_path = url.path.lstrip('/')
+    url_path = url_path if url.netloc.startswith(f"{config.stand['host']}:") else f'{url.netloc}/{url_path}'
+    fixture_exact = hashlib.sha256(f'{url_path}?{url_query}'.encode()).hexdigest()[:16]
+    fixture_path = hashlib.sha256(url_path.encode()).hexdigest()[:16]
+    return fixture_exact, fixture_path
+
+@error_handler_common
+def record_stand_fixture(url, response):
+    # Saves API response to stand fixtures: body and metadata (status and validators).
+    # Streamed response is loaded to memory, caller still reads it with iter_content.
+    # Path only fallback is shared by requests with different queries, so only 200 is
+    # saved there. 304 has no body and is never saved, stand answers it from ETag.
+    if response.status_code == 304:
+        return
+    fixtures_path = config.stand['fixtures']
+    os.makedirs(fixtures_path, exist_ok=True)
+    fixture_metadata = {
+        'url': f'{urlparse(url).netloc}{urlparse(url).path}',
+        'status': response.status_code,
+        'headers': {header: response.headers[header] for header in ['Content-Type', 'ETag', 'Last-Modified'] if header in response.headers}
+    }
+    fixture_body = response.content
+    fixture_names = get_stand_fixture_names(url)
+    for fixture_name in fixture_names if response.status_code == 200 else fixture_names[:1]:
+        write_database_file(f'{fixtures_path}{fixture_name}.body', fixture_body)
+        write_database_file(f'{fixtures_path}{fixture_name}.json', json.dumps(fixture_metadata))
+
+@error_handler_common
+def get_file_hash(file):
+    # Returns SHA-256 hash of file contents or None if file doesn't exists.
+    if not os.path.isfile(file):
+        return None
+    file_hash = hashlib.sha256()
+    with open(file, 'rb') as hashed_file:
+        for chunk in iter(lambda: hashed_file.read(1024 * 64), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+@error_handler_common
+def write_streamed_data(response, file):
+    # Writes streamed API response to temporary file in chunks while hashing it. Temporary
+    # file replaces database file atomically, so readers never see partially written file.
+    # If contents are the same as in database file, database file is left untouched.
+    # Returns True if database file was replaced, False if it wasn't changed and None if
+    # request or writing failed.
+    response.raise_for_status()
+    stream_hash = hashlib.sha256()
+    stream_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(file) or '.', prefix='.', suffix='.tmp', delete=False)
+    try:
+        with stream_file:
+            for chunk in response.iter_content(chunk_size=1024 * 64): # gzip transfer encoding decoded on the fly
+                stream_file.write(chunk)
+                stream_hash.update(chunk)
+        if stream_hash.hexdigest() == get_file_hash(file):
+            return False
+        os.replace(stream_file.name, file)
+        return True
+    finally:
+        response.close()
+        if os.path.exists(stream_file.name):
+            os.remove(stream_file.name)
+
+@error_handler_common
+def write_database_file(file, contents):
+    # Writes contents to temporary file and atomically replaces database file with it.
+    # If contents are the same as in database file, database file is left untouched.
+    # Returns True if database file was replaced.
+    contents = contents.encode() if type(contents) is str else contents
+    if hashlib.sha256(contents).hexdigest() == get_file_hash(file):
+        return False
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(file) or '.', prefix='.', suffix='.tmp', delete=False) as temporary_file:
+        temporary_file.write(contents)
+    os.replace(temporary_file.name, file)
+    return True
+
+@error_handler_common
+def get_database_version(file):
+    # Returns version of database file (short content hash) or None if file doesn't exists.
+    # Version is cached with file stat and recalculated only if file was modified, so files
+    # replaced by other processes are revalidated too.
+    try:
+        file_stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    file_signature = (file_stat.st_mtime_ns, file_stat.st_size)
+    with database_lock:
+        cached = database_versions.get(file)
+    if cached and cached['signature'] == file_signature:
+        return cached['version']
+    file_version = get_file_hash(file)[:16]
+    with database_lock:
+        database_versions[file] = {'signature': file_signature, 'version': file_version}
+    return file_version
+
+@error_handler_common
+def subscribe_database_versions(callback):
+    # Registers callback(database, file, version) called when version of database file changes.
+    with database_lock:
+        database_listeners.append(callback)
+
+@error_handler_common
+def publish_database_version(database, file):
+    # Recalculates version of database file and notifies subscribers if it changed.
+    file_version = get_database_version(file)
+    with database_lock:
+        previous = database_published.get(file)
+        database_published[file] = file_version
+    if file_version == previous:
+        return file_version
+    main_logger.debug(f'{file} version {previous} -> {file_version}')
+    with database_lock:
+        listeners = list(database_listeners)
+    for callback in listeners:
+        callback(database, file, file_version)
+    return file_version
+
+@error_handler_common
+def merge_chart_data(chart_data, chart_update):
+    # Appends new rows to chart data. Rows with same 'date' are replaced by new ones.
+    chart_data = pd.concat([chart_data, chart_update[chart_data.columns]], ignore_index=True)
+    chart_data = chart_data.drop_duplicates(subset='date', keep='last').sort_values(by='date')
+    return chart_data.reset_index(drop=True)
+
+@error_handler_common
+def accumulate_chart_data(database, chart_data, chart_update):
+    # Merges rolling window of API data to stored chart history. Only newest row of each
+    # {seconds} interval is kept (rows of same interval downloaded again are replaced), and
+    # rows older than {retention} days before newest row are dropped.
+    accumulate = config.charts[f'{database}']['file']['accumulate']
+    chart_data = pd.concat([chart_data, chart_update[chart_data.columns]], ignore_index=True)
+    chart_data = chart_data.sort_values(by='date', kind='stable').reset_index(drop=True)
+    chart_seconds = np.where(chart_data['date'] > 9999999999, chart_data['date'] // 1000, chart_data['date'])
+    chart_kept = ~pd.Series(chart_seconds // accumulate['seconds']).duplicated(keep='last').to_numpy()
+    chart_kept &= chart_seconds > chart_seconds.max() - accumulate['retention'] * 86400
+    return chart_data[chart_kept].reset_index(drop=True)
+
+@error_handler_common
+def join_chart_data(database, chart_series):
+    # Aligns columns of all endpoints on common 'date' index in one pass. Dates
+    # missing value in any column are dropped and recorded for the chart.
+    chart_data = pd.concat(chart_series, axis=1, join='outer').sort_index()
+    chart_missing = chart_data.isna().any(axis=1)
+    chart_dropped_dates[database] = chart_data.index[chart_missing].tolist()
+    if chart_missing.any():
+        main_logger.warning(f'{database} dropped {chart_missing.sum()} dates with missing values')
+    chart_data = chart_data[~chart_missing]
+    chart_data.index.name = 'date'
+    return chart_data.reset_index()
+
+@error_handler_common
+def get_chart_start(database):
+    # Returns {start} param value for incremental update of chart or False if chart
+    # should be downloaded in full (no stored data or {resync} minutes passed).
+    chart = config.charts[f'{database}']
+    file = chart['file']['path'] + chart['file']['name']
+    chart_resync = chart['api'].get('resync')
+
+    if not chart_resync or not os.path.isfile(file):
+        return False
+    if time.time() - chart_resyncs.get(database, 0) >= chart_resync * 60:
+        return False
+
+    chart_last_date = pd.read_csv(file, usecols=['date'])['date'].max()
+    if pd.isna(chart_last_date):
+        return False
+    return datetime.utcfromtimestamp(chart_last_date).strftime('%Y-%m-%d')
+
 @error_handler_common
 def make_chart_data(database):
     # Creates chart path if it doesn't exists. Distributes API data to columns using
-    # 'date' column as common denominator. Saves data to database as CSV file.
+    # 'date' column as common denominator. Saves data to database as CSV file. Charts
+    # with {resync} in configuration are updated incrementally from last stored date
+    # and downloaded in full every {resync} minutes. Charts with {accumulate} in file
+    # configuration merge rolling window of API data to stored history. Returns True if
+    # chart was updated.
     chart = config.charts[f'{database}']
 
     # User configuration related variables:
@@ -83,8 +444,14 @@ def make_chart_data(database):
     if not os.path.isdir(file_path):
         os.makedirs(file_path, exist_ok=True)
 
+    # Incremental update asks API only for points after last stored date:
+    chart_start = get_chart_start(database)
+    if chart_start:
+        api_params = dict(api_params, start=chart_start)
+
     if api_extention == 'json':
-        response_columns = pd.DataFrame({'date': []}) # Empty DataFrame for later filling with response DataFrame:
+        response_series = [] # Columns of all endpoints indexed by 'date' for later join in one pass
+        response_columns = pd.DataFrame({'date': []})
         for api_endpoint in api_endpoints:
             response = get_api_data(api_base, api_endpoint, api_params)
             response = response.json()[api_subdict] if api_subdict else response.json()
@@ -92,32 +459,75 @@ def make_chart_data(database):
                 if api_parsed == 'list':
                     for row, column in file_columns[api_endpoint].items():
                         response_data = pd.DataFrame(response[row], columns=['date', f'{column}'])
-                        response_columns = response_columns.merge(response_data, on='date', how='outer').dropna().sort_values(by='date')
+                        response_series.append(response_data.drop_duplicates(subset='date', keep='last').set_index('date'))
                 elif api_parsed == 'dict':
-                    response_data = pd.DataFrame(response).rename(columns=file_columns[api_endpoint])
-                    response_columns = response_columns.merge(response_data, on='date', how='outer').dropna().sort_values(by='date')
+                    response_data = pd.DataFrame(response, columns=list(file_columns[api_endpoint])).rename(columns=file_columns[api_endpoint])
+                    response_series.append(response_data.drop_duplicates(subset='date', keep='last').set_index('date'))
                 else:
                     main_logger.warning(f'unknown type of parsed api response for {database}: {type(api_parsed)}')
             elif type(file_columns) is list:
                 response_columns = pd.DataFrame(list(response.items()), columns=file_columns)
             else:
                 main_logger.warning(f'unknown type of config param file_columns for {database}: {type(file_columns)}')
-            time.sleep(5) # 5 seconds between API callsrequests to comply with API limits in case of multiple endpoints
-        response_columns.to_csv(file, index=False)
+        if response_series:
+            response_columns = join_chart_data(database, response_series)
+        if chart_start:
+            response_columns = merge_chart_data(pd.read_csv(file), response_columns)
+            main_logger.info(f'{database} updated from {chart_start}')
+        elif chart['file'].get('accumulate') and os.path.isfile(file):
+            response_columns = accumulate_chart_data(database, pd.read_csv(file), response_columns)
+            main_logger.info(f'{database} accumulated {len(response_columns)} rows')
+        elif chart['api'].get('resync'):
+            chart_resyncs[database] = time.time()
+        write_database_file(file, response_columns.to_csv(index=False)) # Atomic, as chart is read back by incremental updates
     elif api_extention == 'csv':
         for api_endpoint in api_endpoints:
-            response = get_api_data(api_base, api_endpoint, api_params)
-            time.sleep(5) # 5 seconds between API callsrequests to comply with API limits in case of multiple endpoints
-            with open(file, 'wb') as response_file:
-                response_file.write(response.content)
+            response = get_api_data(api_base, api_endpoint, api_params, stream=True)
+            streamed = write_streamed_data(response, file) if response is not None else None
+            if streamed is None:
+                main_logger.warning(f'{database} not updated, API request failed')
+                return False
+            if not streamed:
+                main_logger.info(f'{database} not changed')
     else:
         main_logger.warning(f'unknown file extention for {database}')
 
+    publish_database_version(database, file)
     main_logger.info(f'{database} updated')
+    return True
     
+@error_handler_common
+def project_snapshot_data(data, subdict, fields):
+    # Reduces API response to subdict and fields used by commands. Values in multiple
+    # currencies (dicts with {currency_vs} key) are reduced to {currency_vs} only.
+    data = data[subdict] if subdict else data
+    if not fields:
+        return data
+    if type(data) is list:
+        return [project_snapshot_data(item, False, fields) for item in data]
+
+    projected_data = {}
+    for field in fields:
+        value = data.get(field)
+        if type(value) is dict and config.currency_vs in value:
+            value = {config.currency_vs: value[config.currency_vs]}
+        projected_data[field] = value
+    return projected_data
+
+@error_handler_common
+def project_saved_snapshot_data(data, subdict, fields):
+    # Projects snapshot file saved before projection at ingest (whole API response), which
+    # still has {subdict} key. Projection by fields only doesn't change projected data.
+    if subdict and not (type(data) is dict and subdict in data):
+        return data
+    return project_snapshot_data(data, subdict, fields)
+
 @error_handler_common
 def make_snapshot_data(database):
     # Creates snapshot path if it doesn't exists. Saves data to database as JSON file.
+    # Requests are conditional on validators of last response. If API responds with 304
+    # or same data, database file and its version are left untouched. Returns True if
+    # snapshot is up to date.
     snapshot = config.snapshots[f'{database}']
 
     # User configuration related variables:
@@ -127,19 +537,41 @@ def make_snapshot_data(database):
 
     file_path = snapshot['file']['path']
     file_name = snapshot['file']['name']
+    file_subdict = snapshot['file']['subdict']
+    file_fields = snapshot['file']['fields']
     file = file_path + file_name
 
     # Create snapshot directory if it doesn' exists:
     if not os.path.isdir(file_path):
         os.makedirs(file_path, exist_ok=True)
 
-    # Call to API and creation JSON file based on response data:
-    response = get_api_data(api_base, api_endpoint, api_params)
-    response = response.json()
-    with open(file, 'w') as json_file:
-        json.dump(response, json_file)
-    
+    # Conditional call to API, validators are sent only if database file still exists:
+    api_headers = {}
+    validators = snapshot_validators.get(database, {})
+    if os.path.isfile(file):
+        if validators.get('ETag'):
+            api_headers['If-None-Match'] = validators['ETag']
+        if validators.get('Last-Modified'):
+            api_headers['If-Modified-Since'] = validators['Last-Modified']
+    response = get_api_data(api_base, api_endpoint, api_params, headers=api_headers)
+    if response.status_code == 304:
+        main_logger.info(f'{database} not modified')
+        return True
+    response.raise_for_status()
+    snapshot_validators[database] = {
+        'ETag': response.headers.get('ETag'),
+        'Last-Modified': response.headers.get('Last-Modified')
+    }
+
+    # Creation of compact JSON file based on projected response data if data changed:
+    response = project_snapshot_data(response.json(), file_subdict, file_fields)
+    if not write_database_file(file, json.dumps(response, separators=(',', ':'))):
+        main_logger.info(f'{database} not changed')
+        return True
+
+    publish_database_version(database, file)
     main_logger.info(f'{database} updated')
+    return True
 
 @error_handler_common
 def format_update_seconds(seconds):
@@ -170,70 +602,279 @@ def clean_databases():
                     files_removed += 1
     main_logger.info(f'removed {files_removed} files')
 
-# @profile
 @error_handler_common
-def update_databases():
-    # Initializes databases. Assigns proper function to handle each database.
+def group_databases_by_provider():
+    # Groups charts and snapshots by API provider (API base domain). Databases of same
+    # provider are listed in order of warm-up priority, chart before snapshot.
+    providers = {}
+    for chart_name, chart in config.charts.items():
+        provider = urlparse(chart['api']['base']).netloc
+        providers.setdefault(provider, []).append((make_chart_data, chart_name))
+    for snapshot_name, snapshot in config.snapshots.items():
+        provider = urlparse(snapshot['api']['base']).netloc
+        providers.setdefault(provider, []).append((make_snapshot_data, snapshot_name))
+    for databases in providers.values():
+        databases.sort(key=lambda database: config.warmup.index(database[1]) if database[1] in config.warmup else len(config.warmup))
+    return providers
+
+@error_handler_common
+def get_database_modules(database):
+    # Returns image and markdown functions of database command module if it exists.
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    module_file = os.path.join(current_directory, 'cmds', f'{database}.py')
+    if not os.path.exists(module_file):
+        return []
+    module = importlib.import_module(f'cmds.{database}')
+    module_functions = [getattr(module, f'draw_{database}', None), getattr(module, f'write_{database}', None)]
+    return [module_function for module_function in module_functions if callable(module_function)]
+
+@error_handler_common
+def set_database_status(database, state):
+    # Sets state of database and reports warm-up progress.
+    with database_lock:
+        database_status[database] = state
+        databases_ready = sum(1 for database_state in database_status.values() if database_state == 'ready')
+        databases_total = len(database_status)
+    if state == 'ready':
+        main_logger.info(f'{database} ready, {databases_ready}/{databases_total} databases ready')
+
+@error_handler_common
+def get_database_status():
+    # Returns copy of databases states and True if all databases are ready.
+    with database_lock:
+        status = dict(database_status)
+    return status, all(state == 'ready' for state in status.values())
+
+@error_handler_common
+def mark_databases_stale():
+    # Marks databases with files from previous run as stale and others as missing.
+    for database in config.charts.keys() | config.snapshots.keys():
+        database_files = []
+        if database in config.charts:
+            database_files.append(config.charts[database]['file']['path'] + config.charts[database]['file']['name'])
+        if database in config.snapshots:
+            database_files.append(config.snapshots[database]['file']['path'] + config.snapshots[database]['file']['name'])
+        set_database_status(database, 'stale' if all(os.path.isfile(file) for file in database_files) else 'missing')
+
+@error_handler_common
+def update_database_data(make_database_data, database):
+    # Updates database data and returns True if update succeeded. Failed update marks
+    # database as failed, failed database is marked as ready again once all its updates
+    # (chart and snapshot) succeed.
+    database_updated = bool(make_database_data(database))
+    with database_lock:
+        if database_updated:
+            database_failures.discard((make_database_data.__name__, database))
+        else:
+            database_failures.add((make_database_data.__name__, database))
+        database_failed = any(failed_database == database for _, failed_database in database_failures)
+        database_state = database_status.get(database)
+    if database_failed:
+        set_database_status(database, 'failed')
+    elif database_state == 'failed':
+        set_database_status(database, 'ready')
+    return database_updated
+
+@error_handler_common
+def get_database_note(command):
+    # Returns note for replies of command if its databases are not updated in this run
+    # yet or their last update failed, so user knows shown values may be outdated.
+    status, ready = get_database_status()
+    states = [status.get(database) for database in config.renders.get(command, [command])]
+    if 'failed' in states:
+        return '\n_Data update failed, values may be outdated_'
+    if any(state in ('missing', 'stale', 'warming') for state in states):
+        return '\n_Data is warming up after restart, values may be outdated_'
+    return ''
+
+@error_handler_common
+def ingest_provider(provider, databases, render=False):
+    # Updates databases of single API provider one after another. Calls to API
+    # are paced by rate limit bucket of provider's API base. With {render} images
+    # and markdown of database are made right after its last data update, if all
+    # updates of database succeeded.
+    provider_start = time.perf_counter()
+    for database_index, (make_database_data, database) in enumerate(databases):
+        if render:
+            set_database_status(database, 'warming')
+        update_database_data(make_database_data, database)
+        if render and database not in [name for _, name in databases[database_index + 1:]]:
+            if get_database_status()[0].get(database) == 'failed':
+                continue
+            for module_function in get_database_modules(database):
+                module_function()
+            set_database_status(database, 'ready')
+    main_logger.info(f'{provider} databases updated in {round(time.perf_counter() - provider_start)} seconds')
+
+@error_handler_common
+def ingest_databases(render=False):
+    # Updates databases of all API providers in parallel threads, one thread per provider.
+    # Overall update takes as long as slowest provider instead of sum of all providers.
+    providers = group_databases_by_provider()
+    main_logger.info(f'databases updating from {len(providers)} providers')
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='ingest') as executor:
+        ingest_futures = [executor.submit(ingest_provider, provider, databases, render) for provider, databases in providers.items()]
+        concurrent.futures.wait(ingest_futures)
+    main_logger.info('databases updated')
+
+@error_handler_common
+def warm_databases():
+    # Updates all databases with images and markdown in order of warm-up priority.
+    warmup_start = time.perf_counter()
+    ingest_databases(render=True)
+    status, ready = get_database_status()
+    not_ready = [database for database, state in status.items() if state != 'ready']
+    main_logger.info(f'warm-up finished in {round(time.perf_counter() - warmup_start)} seconds' + (f', not ready: {not_ready}' if not_ready else ''))
+
+@error_handler_common
+def schedule_databases():
     # Schedules regular updates for each database based on user configuration.
     charts = config.charts
     snapshots = config.snapshots
     updates = config.updates
     delay = config.delay
 
-    clean_databases()
-    main_logger.info(f'charts updating (~{len(charts) * delay} seconds)')
-    for chart_name in charts.keys():
-        make_chart_data(chart_name) # Database chart initialized for the first time
-        time.sleep(delay) # Delay to not exceed rate limits for charts with same API
     for chart_name in charts.keys():
         chart_update_minutes = updates[f'{chart_name}']['minutes']
         chart_update_seconds = format_update_seconds(updates[f'{chart_name}']['seconds'])
-        schedule.every(chart_update_minutes).minutes.at(chart_update_seconds).do(make_chart_data, chart_name)
+        schedule.every(chart_update_minutes).minutes.at(chart_update_seconds).do(update_database_data, make_chart_data, chart_name)
     main_logger.info('charts updates scheduled')
 
-    main_logger.info(f'snapshots updating (~{len(snapshots) * delay} seconds)')
-    for snapshot_name in snapshots.keys():
-        make_snapshot_data(snapshot_name) # Database snapshot initialized for the first time
-        time.sleep(delay) # Delay to not exceed rate limits for snapshots with same API
     for snapshot_name in snapshots.keys():
         snapshot_update_minutes = updates[f'{snapshot_name}']['minutes']
         snapshot_update_seconds = format_update_seconds(updates[f'{snapshot_name}']['seconds'] + delay)
-        schedule.every(snapshot_update_minutes).minutes.at(snapshot_update_seconds).do(make_snapshot_data, snapshot_name)
+        schedule.every(snapshot_update_minutes).minutes.at(snapshot_update_seconds).do(update_database_data, make_snapshot_data, snapshot_name)
     main_logger.info('snapshots updates scheduled')
 
     # List of all databases no matter if chart or snapshot:
     databases = list(charts.keys() | snapshots.keys())
-    current_directory = os.path.dirname(os.path.abspath(__file__))
     for database in databases:
-        module_file = os.path.join(current_directory, 'cmds', f'{database}.py')
-        if os.path.exists(module_file):
-            module_name = f'cmds.{database}'
-            module = importlib.import_module(module_name)
-            module_draw_image = getattr(module, f'draw_{database}', None)
-            module_write_markdown = getattr(module, f'write_{database}', None)
-            module_update_minutes = updates[f'{database}']['minutes']
-            module_update_seconds = format_update_seconds(updates[f'{database}']['seconds'])
-            module_functions = [module_draw_image, module_write_markdown]
-            for module_function in module_functions:
-                if callable(module_function): # Each database module checked if contains image and/or markdown functions
-                    module_function()
-                    schedule.every(module_update_minutes).minutes.at(module_update_seconds).do(functools.partial(module_function))
+        module_update_minutes = updates[f'{database}']['minutes']
+        module_update_seconds = format_update_seconds(updates[f'{database}']['seconds'])
+        for module_function in get_database_modules(database): # Each database module checked if contains image and/or markdown functions
+            schedule.every(module_update_minutes).minutes.at(module_update_seconds).do(functools.partial(module_function))
     main_logger.info('image updates scheduled')
     main_logger.info('markdown updates scheduled')
 
     schedule.every(1).days.at('00:00:00').do(functools.partial(clean_databases))
     main_logger.info('database cleaning scheduled')
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+
+# @profile
+@error_handler_common
+def update_databases():
+    # Initializes databases without blocking bot start. Files of previous run are served
+    # as stale while databases are warmed up in background thread in priority order.
+    # Regular updates are scheduled right away and run by schedule loop of bot.
+    clean_databases()
+    mark_databases_stale()
+    schedule_databases()
+    warmup_thread = threading.Thread(target=warm_databases, name='warmup', daemon=True)
+    warmup_thread.start()
+    main_logger.info('databases warm-up started')
+    return warmup_thread
 
 
 '''
 Functions for plot design:
+- create figure for thread-safe drawing
+- keep figure templates reused by renders
+- render figure to image and overlay it on background
+- downsample long plot lines
 - choose background image and colors
 - format time axis to common abbreviation
 '''
 
+# Figure templates of plots, each thread (and render worker) has its own templates:
+plot_templates = threading.local()
+
+def make_figure(figsize):
+    # Returns figure with its own Agg canvas outside of pyplot global state, so figures
+    # can be drawn in parallel threads.
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+@contextlib.contextmanager
+def create_figure(figsize):
+    # Creates figure for single render. Figure is cleared on exit even if drawing failed.
+    figure = make_figure(figsize)
+    try:
+        yield figure
+    finally:
+        figure.clear()
+
+@error_handler_common
+def get_plot_template(name, build_template):
+    # Returns figure template of plot for current thread. Template (figure, axes, lines
+    # and legend) is built by build_template on first call, later renders only update its
+    # data, limits and ticks.
+    templates = plot_templates.__dict__.setdefault('templates', {})
+    if name not in templates:
+        template = build_template()
+        if template is None:
+            return None
+        templates[name] = template
+    return templates[name]
+
+@error_handler_common
+def replace_template_fills(template, fills):
+    # Removes fill polygons of previous render from template and keeps new ones.
+    for fill in template['fills']:
+        fill.remove()
+    template['fills'] = fills
+
+@error_handler_common
+def render_figure_image(figure, dpi=150):
+    # Draws figure on its Agg canvas and returns transparent RGBA image cropped to tight
+    # bounding box, same as savefig with bbox_inches='tight'. Pixels are taken from canvas
+    # buffer, so plot is not encoded to PNG and decoded back.
+    figure.set_dpi(dpi)
+    figure.patch.set_facecolor('none')
+    for ax in figure.axes:
+        ax.patch.set_facecolor('none')
+    canvas = figure.canvas
+    canvas.draw()
+    canvas_buffer = canvas.buffer_rgba()
+    height, width = canvas_buffer.shape[:2]
+    bbox = figure.get_tightbbox(canvas.get_renderer()).padded(0.1)
+    crop_box = (max(math.floor(bbox.x0 * dpi), 0),
+                max(math.floor(height - bbox.y1 * dpi), 0),
+                min(math.ceil(bbox.x1 * dpi), width),
+                min(math.ceil(height - bbox.y0 * dpi), height))
+    return Image.frombuffer('RGBA', (width, height), canvas_buffer, 'raw', 'RGBA', 0, 1).crop(crop_box)
+
+@error_handler_common
+def save_plot_image(background_image, plot_image, coordinates, file):
+    # Overlays plot image on background image and encodes result to JPEG file.
+    background_image.paste(plot_image, coordinates, mask=plot_image)
+    background_image.save(file, "JPEG", quality=90, icc_profile=background_image.info.get('icc_profile', ''))
+
+@error_handler_common
+def downsample_plot_line(x, y, points=None):
+    # Reduces line to {points} with Largest-Triangle-Three-Buckets. First and last points
+    # are kept, other points are split to buckets and from each bucket point making largest
+    # triangle with point kept from previous bucket and average of next bucket is kept.
+    # NaN values (start of rolling averages) are not drawn, so they are dropped.
+    points = points or config.downsample['points']
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    drawn = ~np.isnan(y)
+    x, y = x[drawn], y[drawn]
+    if not config.downsample['enabled'] or points < 3 or len(x) <= points:
+        return x, y
+
+    edges = np.linspace(1, len(x) - 1, points - 1).astype(int)
+    kept = np.zeros(points, dtype=int)
+    kept[-1] = len(x) - 1
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else len(x)
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        kept_x, kept_y = x[kept[bucket]], y[kept[bucket]]
+        areas = np.abs((kept_x - next_x) * (y[start:end] - kept_y) - (kept_x - x[start:end]) * (next_y - kept_y))
+        kept[bucket + 1] = start + np.argmax(areas)
+    return x[kept], y[kept]
+
 @error_handler_common
 def define_key_metric_movement(plot, key_metric_change_percentage):
     # Defines backround image and colors based on % of key metric movement